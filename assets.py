@@ -0,0 +1,86 @@
+"""
+shared images of the game
+
+Every file is decoded once and every size is scaled once, sprites share the surfaces. Scaled images can also be kept
+in an on-disk cache as raw pixels, keyed by the hash of the source file and the size, so a later start neither
+decodes nor scales the large images.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Dict, Tuple
+
+import pygame as pg
+
+ASSET_CACHE_DIR = '.asset_cache'
+
+
+class AssetManager:
+    def __init__(self, cache_dir: str | None = None):
+        """cache_dir: directory of the on-disk cache of scaled images, None disables it"""
+        self.cache_dir = cache_dir
+        self._sources: Dict[str, pg.Surface] = {}
+        self._scaled: Dict[Tuple[str, Tuple[int, int] | None, bool], pg.Surface] = {}
+        self._digests: Dict[str, str] = {}
+
+    def image(self, path: str, size: Tuple[int, int] | None = None, alpha: bool = True) -> pg.Surface:
+        """
+        the image of path smoothscaled to size, converted for fast blits (needs a display mode)
+        the surface is shared, copy it before changing it
+        """
+        key = path, size, alpha
+        image = self._scaled.get(key)
+        if image is None:
+            image = self._load_cached(path, size, alpha) if size is not None else None
+            if image is None:
+                image = self._source(path)
+                if size is not None:
+                    image = pg.transform.smoothscale(image, size)
+                    self._store_cached(path, image, alpha)
+                image = image.convert_alpha() if alpha else image.convert()
+            self._scaled[key] = image
+        return image
+
+    def _source(self, path: str) -> pg.Surface:
+        image = self._sources.get(path)
+        if image is None:
+            image = self._sources[path] = pg.image.load(path)
+        return image
+
+    def _digest(self, path: str) -> str:
+        digest = self._digests.get(path)
+        if digest is None:
+            with open(path, 'rb') as f:
+                digest = self._digests[path] = hashlib.sha1(f.read()).hexdigest()
+        return digest
+
+    def _cache_path(self, path: str, size: Tuple[int, int], alpha: bool) -> str:
+        mode = 'RGBA' if alpha else 'RGB'
+        return os.path.join(self.cache_dir, f'{self._digest(path)}_{size[0]}x{size[1]}_{mode}.raw')
+
+    def _load_cached(self, path: str, size: Tuple[int, int], alpha: bool) -> pg.Surface | None:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._cache_path(path, size, alpha), 'rb') as f:
+                data = f.read()
+            image = pg.image.frombytes(data, size, 'RGBA' if alpha else 'RGB')
+        except (OSError, ValueError):
+            return None
+        return image.convert_alpha() if alpha else image.convert()
+
+    def _store_cached(self, path: str, image: pg.Surface, alpha: bool) -> None:
+        if self.cache_dir is None:
+            return
+        cache_path = self._cache_path(path, image.get_size(), alpha)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write and rename, so another instance never reads half a file
+            tmp = f'{cache_path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(pg.image.tobytes(image, 'RGBA' if alpha else 'RGB'))
+            os.replace(tmp, cache_path)
+        except OSError:
+            # the cache is optional
+            pass
@@ -0,0 +1,960 @@
+"""
+the pygame window of the game: sprites, drawing and mouse input
+
+game.py loads this module only when the window is opened, everything else runs without pygame.
+"""
+from __future__ import annotations
+
+import functools
+import time
+import pygame as pg
+import pygame_widgets as pgw
+from pygame_widgets.button import Button
+from pygame_widgets.dropdown import Dropdown
+from pygame_widgets.widget import WidgetHandler
+from pygame.locals import *
+from typing import List, Tuple, Any, Optional, Set, Union
+
+from assets import ASSET_CACHE_DIR, AssetManager
+from game import (AI, COORDINATES, MOVE, AccessIllegalField, Action, CodeUnreachable, FatalError, GameStatus,
+                  IllegalMove, PieceStatus, Player, _PLAYERS, _encode_move, check_access)
+from mill.position import BLACK, WHITE, board_str
+from mill.state import OVER, PLACING, REMOVING, GameState
+from mill.timecontrol import Clock, TimeControl, format_time
+from mill.topology import POINT_INDEX, POINTS
+from mill.worker import SearchTask
+
+if not pg.font:
+    print("Warning, fonts disabled")
+if not pg.mixer:
+    print("Warning, sound disabled")
+
+# Type alias
+SCREEN_COORDINATES = Tuple[int, int]
+
+# Constants
+_SIZE = (1000, 850)
+_PIECE_SIZE = (60, 60)  # (68, 68)
+_FIELD_SIZE = (25, 25)
+_MOUSE_SIZE = (20, 20)
+
+_FONT_SIZE = 32
+_WINNER_FONT_SIZE = 200
+_CLOCK_FONT_SIZE = 24
+# the time of a clock is shown in red below this many seconds
+_CLOCK_WARNING = 10
+# rendered texts kept in the cache (actions, thinking animation, winners, ...)
+_TEXT_CACHE_SIZE = 32
+# default frame cap of the dirty rects mode (the full redraw waits for vsync instead)
+_FRAME_RATE = 60
+# longest wait for an event of an idle board in milliseconds
+_IDLE_TIMEOUT = 1000
+
+_AI_LEVEL_CHOICES = ['player', 'random', *[f'level {i}' for i in range(1, 10)]]
+
+# images shared by all sprites
+_ASSETS = AssetManager()
+
+# pixel positions
+_POSITIONS_BANK_WHITE = [(50, y) for y in range(95, 896, 89)]
+_POSITIONS_BANK_BLACK = [(951, y) for y in range(94, 895, 89)]
+_POSITIONS_BOARD = [
+    [
+        [(150, 100), (500, 100), (850, 100)],
+        [(150, 450), (500, 450), (850, 450)],
+        [(150, 800), (500, 800), (850, 800)],
+    ],
+    [
+        [(265, 215), (500, 215), (734, 215)],
+        [(265, 450), (500, 450), (734, 450)],
+        [(265, 684), (500, 684), (734, 684)],
+    ],
+    [
+        [(382, 332), (500, 332), (617, 332)],
+        [(382, 450), (500, 450), (617, 450)],
+        [(382, 567), (500, 567), (617, 567)],
+    ],
+]
+# x and z are wrong => transpose inner 2d lists
+_POSITIONS_BOARD = [[list(x) for x in zip(*matrix)] for matrix in _POSITIONS_BOARD]
+
+# a piece is picked if the mouse circle touches it and dropped on the field it touches
+_PICK_RADIUS = (_MOUSE_SIZE[0] + _PIECE_SIZE[0]) / 2
+_DROP_RADIUS = (_PIECE_SIZE[0] + _FIELD_SIZE[0]) / 2
+# cell size of the hit test grid in pixels
+_HIT_CELL = 25
+
+
+class Mouse(pg.sprite.Sprite):
+    def __init__(self):
+        super().__init__()
+        self.image = _ASSETS.image('pictures/mouse.png', _MOUSE_SIZE)
+        self.rect = self.image.get_rect()
+        self.radius = _MOUSE_SIZE[0] / 2
+
+    def update(self):
+        """move the fist based on the mouse position"""
+        pos = pg.mouse.get_pos()
+        self.rect.topleft = pos
+
+
+class Empty(pg.sprite.Sprite):
+    def __init__(self, coords: COORDINATES):
+        super().__init__()
+        self.image = pg.Surface(_FIELD_SIZE)
+        self.on_board = True
+        self.position: COORDINATES | int = coords
+        self.rect = self.image.get_rect()
+        self.rect.center = _get_board_position(coords)
+        self.radius = _FIELD_SIZE[0] / 2
+        self.player: Player | None = None
+
+    def set_position(self, coords: COORDINATES) -> None:
+        self.position = coords
+        self.rect.center = _get_board_position(coords)
+
+
+class Piece(pg.sprite.Sprite):
+    def __init__(self, position: COORDINATES | int, player: Player):
+        super().__init__()
+        self.player = player
+        self.movable = False
+        # all pieces of a player share the image
+        if player == Player.WHITE:
+            self.image = _ASSETS.image('pictures/piece_white.png', _PIECE_SIZE)
+        else:
+            self.image = _ASSETS.image('pictures/piece_black.png', _PIECE_SIZE)
+        self.status = PieceStatus.OUT
+        self.position: COORDINATES | int = position
+        self.rect = self.image.get_rect()
+        self.radius = _PIECE_SIZE[0] / 2
+
+    def set_position(self, coords: COORDINATES) -> None:
+        self.position = coords
+        if self.status == PieceStatus.BOARD:
+            self.rect.center = _get_board_position(coords)
+        else:
+            raise IllegalMove("You can't move a piece that's not on the board")
+
+
+# Type Alias
+BOARD_SPRITES = List[List[List[Union[Piece, Empty]]]]
+# (None, coordinates) of a board point or (player, index) of a bank slot
+SLOT = Tuple[Optional['Player'], Union[COORDINATES, int]]
+# (key, image, rect), the key identifies what the image shows
+SCENE_ITEM = Tuple[Any, pg.Surface, pg.Rect]
+
+
+class Game:
+    """
+    board is 3d list:
+    r(ing): outer, middle, inner ring
+    ┌────> x
+    │
+    │
+    v
+    y
+
+    ┌────────┬────────┐
+    │  ┌─────┼─────┐  │
+    │  │  ┌──┴──┐  │  │
+    ├──┼──┤     ├──┼──┤
+    │  │  └──┬──┘  │  │
+    │  └─────┼─────┘  │
+    └────────┴────────┘
+    """
+
+    def __init__(self, workers: int = 1, dirty_rects: bool = False, asset_cache: str | None = ASSET_CACHE_DIR,
+                 idle_wait: bool = False, frame_rate: int | None = None, ponder: bool = True,
+                 time_control: TimeControl | None = None):
+        """
+        workers: number of processes of the ai search, 0 uses all cores
+        dirty_rects: only redraw and update the changed areas of the screen instead of the whole frame
+        asset_cache: directory of the pre-scaled images (see assets.py), None disables it
+        idle_wait: sleep until the next event while nothing is dragged and the ai doesn't move
+        frame_rate: maximal frames per second, None only waits for vsync (60 in the dirty rects mode)
+        ponder: the ai searches in the background while a human thinks about the move
+        time_control: chess clock of both players, a player whose time is up loses
+        """
+        start = time.perf_counter()
+        _ASSETS.cache_dir = asset_cache
+        # init_pygame
+        pg.init()
+        self.screen = pg.display.set_mode(_SIZE, flags=pg.SCALED, vsync=1)
+        pg.display.set_caption('Mill game')
+        pg.display.set_icon(_ASSETS.image('pictures/icon.png'))
+        pg.mouse.set_visible(False)
+        self.background = _ASSETS.image('pictures/background.png', _SIZE, alpha=False)
+        self.mouse = Mouse()
+        self.mouse_sprites = pg.sprite.Group(self.mouse)
+
+        self.refresh_button, self.ai_level_white_dropdown, self.ai_level_black_dropdown = self._create_widgets()
+        self.winning_sound = _load_sound('sounds/tada.wav')
+        self.no_sound = _load_sound('sounds/chord.wav')
+
+        # images
+        # indicate whose turn it is
+        self.black_piece_img_turn = _ASSETS.image('pictures/piece_black.png', (44, 44))
+        self.white_piece_img_turn = _ASSETS.image('pictures/piece_white.png', (44, 44))
+
+        # indicates last turn via piece
+        self.black_piece_img_last = _ASSETS.image('pictures/piece_black.png', _PIECE_SIZE).copy()
+        self.black_piece_img_last.fill((255, 255, 255, 128), None, pg.BLEND_RGBA_MULT)
+
+        self.white_piece_img_last = _ASSETS.image('pictures/piece_white.png', _PIECE_SIZE).copy()
+        self.white_piece_img_last.fill((255, 255, 255, 128), None, pg.BLEND_RGBA_MULT)
+
+        # highlights last turn
+        self.yellow_circle = pg.Surface(_PIECE_SIZE, pg.SRCALPHA)
+        pg.draw.circle(self.yellow_circle, (255, 255, 0, 128 // 3), (_PIECE_SIZE[0] / 2, _PIECE_SIZE[1] / 2),
+                       _PIECE_SIZE[0] / 2)
+
+        self.red_circle = pg.Surface(_PIECE_SIZE, pg.SRCALPHA)
+        pg.draw.circle(self.red_circle, (255, 0, 0, 128 // 3), (_PIECE_SIZE[0] / 2, _PIECE_SIZE[1] / 2),
+                       _PIECE_SIZE[0] / 2)
+
+        # init pieces
+        self.moving_piece: Piece | None = None
+        self.board: List[List[List[Piece | Empty]]] = [[[(None if x == y == 1 else Empty((ring, x, y)))
+                                                         for y in range(3)] for x in range(3)] for ring in range(3)]
+        self.piece_bank_white: List[Piece | Empty] = [Piece(i, Player.WHITE) for i in range(9)]
+        self.piece_bank_black: List[Piece | Empty] = [Piece(i, Player.BLACK) for i in range(9)]
+        for (piece, position) in zip(self.piece_bank_white, _POSITIONS_BANK_WHITE):
+            piece.rect.center = position
+        for (piece, position) in zip(self.piece_bank_black, _POSITIONS_BANK_BLACK):
+            piece.rect.center = position
+        self.pieces = pg.sprite.Group((*self.piece_bank_white, *self.piece_bank_black))
+
+        # init game properties
+        # the rules, the sprites only show the state
+        self.state = GameState()
+        self.status = GameStatus.PLACING
+        self.player = Player.WHITE
+        self.action = Action.PLACE
+        self.winner: Player | None = None
+        self.ai_level_white = -1
+        self.ai_level_black = -1
+        self.last_move: Tuple[SCREEN_COORDINATES, SCREEN_COORDINATES] | None = None
+        self.last_remove: SCREEN_COORDINATES | None = None
+        self.ai = AI(workers=workers)
+        self.ai_task: SearchTask | None = None
+        self.ponder = ponder
+        # kept until the ai moves, so a finished ponder isn't restarted in the same turn
+        self.ponder_task: SearchTask | None = None
+        self.time_control = time_control
+        self.chess_clock = Clock(time_control) if time_control is not None else None
+
+        # rendering
+        self.dirty_rects = dirty_rects
+        self.idle_wait = idle_wait
+        self.frame_rate = frame_rate if frame_rate is not None or not dirty_rects else _FRAME_RATE
+        self.clock = pg.time.Clock()
+        # scene and widget areas of the last frame, None redraws everything
+        self.drawn: Set[Tuple[Any, Tuple[int, int, int, int]]] | None = None
+        self.drawn_widgets: List[pg.Rect] = []
+        # seconds from the start of __init__ until the game is ready
+        self.startup_time = time.perf_counter() - start
+
+    def _create_widgets(self) -> Tuple[Button, Dropdown, Dropdown]:
+        # buttons
+        restart_button = Button(
+            # Mandatory Parameters
+            self.screen,  # Surface to place button on
+            805,  # X-coordinate of top left corner
+            5,  # Y-coordinate of top left corner
+            90,  # Width
+            40,  # Height
+
+            # Optional Parameters
+            text='restart',  # Text to display
+            fontSize=_FONT_SIZE,  # Size of font
+            textColour=(0, 255, 0),
+            margin=20,  # Minimum distance between text/image and edge of button
+            inactiveColour=(200, 50, 0),  # Colour of button when not being interacted with
+            hoverColour=(150, 25, 0),  # Colour of button when being hovered over
+            pressedColour=(100, 0, 0),  # Colour of button when being clicked
+            radius=10,  # Radius of border corners (leave empty for not curved)
+            onRelease=self.restart,  # Function to call when button released
+        )
+
+        ai_level_white = Dropdown(
+            self.screen,
+            5,
+            5,
+            90,
+            40,
+            name='player',
+            choices=_AI_LEVEL_CHOICES,
+            borderRadius=10,
+            inactiveColour=(0, 0, 255),  # Colour of button when not being interacted with
+            hoverColour=(0, 0, 139),  # Colour of button when being hovered over
+            pressedColour=(0, 0, 128),  # Colour of button when being clicked
+            values=list(range(-1, 10)),
+            textColour=(0, 255, 0),
+            fontSize=_FONT_SIZE,
+            direction='down',
+            onRelease=self._set_ai_level,
+            onReleaseParams=(Player.WHITE,),
+
+        )
+
+        ai_level_black = Dropdown(
+            self.screen,
+            905,
+            5,
+            90,
+            40,
+            name='player',
+            choices=_AI_LEVEL_CHOICES,
+            borderRadius=10,
+            inactiveColour=(0, 0, 255),  # Colour of button when not being interacted with
+            hoverColour=(0, 0, 139),  # Colour of button when being hovered over
+            pressedColour=(0, 0, 128),  # Colour of button when being clicked
+            values=list(range(-1, 10)),
+            textColour=(0, 255, 0),
+            fontSize=_FONT_SIZE,
+            direction='down',
+            onRelease=self._set_ai_level,
+            onReleaseParams=(Player.BLACK,),
+
+        )
+        return restart_button, ai_level_white, ai_level_black
+
+    def restart(self) -> None:
+        self._cancel_ai()
+
+        # init pieces
+        self.moving_piece: Piece | None = None
+        self.board: List[List[List[Piece | Empty]]] = [[[(None if x == y == 1 else Empty((ring, x, y)))
+                                                         for y in range(3)] for x in range(3)] for ring in range(3)]
+        self.piece_bank_white: List[Piece | Empty] = [Piece(i, Player.WHITE) for i in range(9)]
+        self.piece_bank_black: List[Piece | Empty] = [Piece(i, Player.BLACK) for i in range(9)]
+        for (piece, position) in zip(self.piece_bank_white, _POSITIONS_BANK_WHITE):
+            piece.rect.center = position
+        for (piece, position) in zip(self.piece_bank_black, _POSITIONS_BANK_BLACK):
+            piece.rect.center = position
+        self.pieces = pg.sprite.Group((*self.piece_bank_white, *self.piece_bank_black))
+
+        # init game properties
+        # the rules, the sprites only show the state
+        self.state = GameState()
+        self.status = GameStatus.PLACING
+        self.player = Player.WHITE
+        self.action = Action.PLACE
+        self.winner = None
+        self.last_move = None
+        self.last_remove = None
+        self.ai.reset()
+        if self.time_control is not None:
+            self.chess_clock = Clock(self.time_control)
+
+    def run_game(self) -> None:
+        # game loop:
+        while self.status != GameStatus.QUIT:
+            # --- Main event loop
+            events = self._get_events()
+            for event in events:
+                # User did something
+                if event.type == pg.QUIT:
+                    # user clicked close, flag that we are done, so we exit this loop
+                    self.status = GameStatus.QUIT
+
+                # update mouse
+                self.mouse.update()
+                if self._is_ai_turn():
+                    # the board belongs to the ai
+                    pass
+                elif self.status == GameStatus.PLACING:
+                    self._handle_placing(event)
+                elif self.status == GameStatus.MOVING:
+                    self._handle_moving(event)
+                elif self.status in (GameStatus.PLACING_REMOVING, GameStatus.MOVING_REMOVING):
+                    self._handle_removing(event)
+                elif self.status == GameStatus.OVER:
+                    pass
+                elif self.status == GameStatus.QUIT:
+                    pass
+                else:
+                    raise CodeUnreachable()
+
+            self._update_clock()
+            if self._is_ai_turn():
+                # ai move, searched in the background
+                self.action = Action.WAIT
+                if self.ai_task is None:
+                    self.ai.set_level(self.ai_level_white if self.player == Player.WHITE else self.ai_level_black)
+                    # the search stops the pondering and reuses its result
+                    if self.chess_clock is not None:
+                        self.ai_task = self.ai.get_move_async(self.state, self.chess_clock.time_left(self.state.turn),
+                                                              self.time_control.increment)
+                    else:
+                        self.ai_task = self.ai.get_move_async(self.state)
+                    self.ponder_task = None
+                elif self.ai_task.done():
+                    move = self.ai_task.result()
+                    self.ai_task = None
+                    self._handle_ai_move(move)
+            elif self._should_ponder():
+                level = self.ai_level_black if self.player == Player.WHITE else self.ai_level_white
+                if self.chess_clock is not None:
+                    # the clock of the ai doesn't run while it ponders
+                    self.ponder_task = self.ai.ponder_async(self.state, level,
+                                                            self.chess_clock.time_left(1 - self.state.turn),
+                                                            self.time_control.increment)
+                else:
+                    self.ponder_task = self.ai.ponder_async(self.state, level)
+
+            dirty = self._draw_game(events)
+
+            # update screen
+            if self.dirty_rects:
+                if dirty:
+                    pg.display.update(dirty)
+            else:
+                pg.display.flip()
+            if self.frame_rate:
+                self.clock.tick(self.frame_rate)
+
+        # Close the window and quit.
+        self._cancel_ai()
+        self.ai.close()
+        pg.quit()
+
+    def _get_events(self) -> List[pg.Event]:
+        if self.idle_wait and self.moving_piece is None and not self._is_ai_turn():
+            # nothing changes until the user does something
+            event = pg.event.wait(_IDLE_TIMEOUT)
+            events = [] if event.type == NOEVENT else [event]
+            events.extend(pg.event.get())
+        else:
+            events = pg.event.get()
+        return _coalesce_motion(events)
+
+    def _get_slot(self, slot: SLOT) -> Piece | Empty:
+        player, position = slot
+        if player is None:
+            return self.get_field(position)
+        return (self.piece_bank_white if player == Player.WHITE else self.piece_bank_black)[position]
+
+    def _get_piece_at(self, pos: SCREEN_COORDINATES) -> Piece | None:
+        """the piece on the board or in a bank under the mouse at pos"""
+        slot = _HIT_GRID.get(pos, _PICK_RADIUS)
+        field = None if slot is None else self._get_slot(slot)
+        return field if isinstance(field, Piece) else None
+
+    def _get_empty_at(self, pos: SCREEN_COORDINATES) -> Empty | None:
+        """the free field on the board or in a bank a piece at pos is dropped on"""
+        slot = _HIT_GRID.get(pos, _DROP_RADIUS)
+        field = None if slot is None else self._get_slot(slot)
+        return field if isinstance(field, Empty) else None
+
+    def _is_ai_turn(self) -> bool:
+        return self.status in (GameStatus.PLACING, GameStatus.MOVING) and \
+            ((self.player == Player.BLACK and self.ai_level_black != -1) or
+             (self.player == Player.WHITE and self.ai_level_white != -1))
+
+    def _should_ponder(self) -> bool:
+        """a human is to move and the ai plays the reply"""
+        if not self.ponder or self.ponder_task is not None:
+            return False
+        if self.status not in (GameStatus.PLACING, GameStatus.MOVING, GameStatus.PLACING_REMOVING,
+                               GameStatus.MOVING_REMOVING):
+            return False
+        return (self.ai_level_black if self.player == Player.WHITE else self.ai_level_white) != -1
+
+    def _cancel_ai(self) -> None:
+        if self.ai_task is not None:
+            self.ai_task.cancel()
+            self.ai_task = None
+        if self.ponder_task is not None:
+            self.ponder_task.cancel()
+            self.ponder_task = None
+
+    def _update_clock(self) -> None:
+        """runs the time of the player to move, a player whose time is up loses"""
+        if self.chess_clock is None:
+            return
+        if self.status in (GameStatus.OVER, GameStatus.QUIT):
+            self.chess_clock.stop(increment=False)
+            return
+        self.chess_clock.start(self.state.turn)
+        for side in (WHITE, BLACK):
+            if self.chess_clock.flagged(side):
+                self._cancel_ai()
+                self.chess_clock.stop(increment=False)
+                self.winning_sound.play()
+                self.status = GameStatus.OVER
+                self.action = Action.OVER
+                self.winner = _PLAYERS[1 - side]
+
+    def _update_status(self) -> None:
+        """maps the phase of the rules to the status, the player and the action shown by the ui"""
+        phase = self.state.phase()
+        self.player = _PLAYERS[self.state.turn]
+        if phase == OVER:
+            if self.status != GameStatus.OVER:
+                self.winning_sound.play()
+            self.status = GameStatus.OVER
+            self.action = Action.OVER
+            self.winner = _PLAYERS[self.state.winner()]
+        elif phase == REMOVING:
+            self.status = GameStatus.PLACING_REMOVING if self.state.pending[0] is None else GameStatus.MOVING_REMOVING
+            self.action = Action.REMOVE
+        elif phase == PLACING:
+            self.status = GameStatus.PLACING
+            self.action = Action.PLACE
+        else:
+            self.status = GameStatus.MOVING
+            self.action = Action.FLY if self.state.is_flying() else Action.MOVE
+
+    def _handle_ai_move(self, move: MOVE) -> None:
+        src, dest, rmv = move
+        self.state.apply(_encode_move(move))
+
+        if src is None:
+            bank = self.piece_bank_white if self.player == Player.WHITE else self.piece_bank_black
+            for i in range(9):
+                if isinstance(bank[i], Piece) and bank[i].player == self.player:
+                    src = i
+            self.place_piece(dest, self.player, src)
+            bank = _POSITIONS_BANK_BLACK if self.player == Player.BLACK else _POSITIONS_BANK_WHITE
+            self.last_move = (bank[src], _get_board_position(dest))
+        else:
+            self._move_piece(src, dest)
+            self.last_move = (_get_board_position(src), _get_board_position(dest))
+
+        self.last_remove = None
+        if rmv is not None:
+            self.remove_piece(rmv, self.player.get_next())
+            self.last_remove = _get_board_position(rmv)
+        self._update_status()
+
+    def _handle_placing(self, event: pg.Event) -> None:
+        if event.type == MOUSEBUTTONDOWN:
+            self.moving_piece = self._get_piece_at(self.mouse.rect.center)
+            if self.moving_piece:
+                if self.moving_piece.status != PieceStatus.OUT or self.moving_piece.player != self.player:
+                    self.no_sound.play()
+                    self.moving_piece = None
+
+        elif event.type == MOUSEBUTTONUP:
+            if self.moving_piece:
+                field = self._get_empty_at(self.moving_piece.rect.center)
+                pos = _POSITIONS_BANK_WHITE if self.player == Player.WHITE else _POSITIONS_BANK_BLACK
+                if field and field.on_board:
+                    try:
+                        self.state.begin(None, POINT_INDEX[field.position])
+                    except IllegalMove:
+                        self.no_sound.play()
+                        # snap back
+                        self.moving_piece.rect.center = pos[self.moving_piece.position]
+                    else:
+                        self.place_piece(field.position, self.player, self.moving_piece.position)
+                        self.last_remove = None
+                        self.last_move = (pos[field.position], _get_board_position(self.moving_piece.position))
+                        self._update_status()
+                else:
+                    # snap back
+                    self.no_sound.play()
+                    self.moving_piece.rect.center = pos[self.moving_piece.position]
+                self.moving_piece = None
+
+        elif event.type == MOUSEMOTION and self.moving_piece:
+            self.moving_piece.rect.move_ip(event.rel)
+
+    def _handle_moving(self, event: pg.Event) -> None:
+        if event.type == MOUSEBUTTONDOWN:
+            self.moving_piece = self._get_piece_at(self.mouse.rect.center)
+            if self.moving_piece:
+                if self.moving_piece.status != PieceStatus.BOARD or self.moving_piece.player != self.player:
+                    self.no_sound.play()
+                    self.moving_piece = None
+
+        elif event.type == MOUSEBUTTONUP:
+            if self.moving_piece:
+                field = self._get_empty_at(self.moving_piece.rect.center)
+                if field and field.on_board:
+                    src, dest = self.moving_piece.position, field.position
+                    try:
+                        self.state.begin(POINT_INDEX[src], POINT_INDEX[dest])
+                    except IllegalMove:
+                        self.no_sound.play()
+                        # snap back
+                        self.moving_piece.rect.center = _get_board_position(src)
+                    else:
+                        self._move_piece(src, dest, self.player)
+                        self.last_remove = None
+                        self.last_move = (_get_board_position(src), _get_board_position(dest))
+                        self._update_status()
+                else:
+                    self.no_sound.play()
+                    # snap back
+                    self.moving_piece.rect.center = _get_board_position(self.moving_piece.position)
+                self.moving_piece = None
+
+        elif event.type == MOUSEMOTION and self.moving_piece:
+            self.moving_piece.rect.move_ip(event.rel)
+
+    def _handle_removing(self, event: pg.Event) -> None:
+        if event.type == MOUSEBUTTONDOWN:
+            self.moving_piece = self._get_piece_at(self.mouse.rect.center)
+            if self.moving_piece:
+                if self.moving_piece.status != PieceStatus.BOARD or \
+                        not self.state.removable() >> POINT_INDEX[self.moving_piece.position] & 1:
+                    self.no_sound.play()
+                    self.moving_piece = None
+
+        elif event.type == MOUSEBUTTONUP:
+            if self.moving_piece:
+                field = self._get_empty_at(self.moving_piece.rect.center)
+                if field and not field.on_board and field.player == self.player:
+                    coords = self.moving_piece.position
+                    self.state.finish(POINT_INDEX[coords])
+                    self.remove_piece(coords, self.player.get_next(), field.position)
+                    self.last_remove = _get_board_position(field.position)
+                    self._update_status()
+                else:
+                    # snap back
+                    self.no_sound.play()
+                    self.moving_piece.rect.center = _get_board_position(self.moving_piece.position)
+                self.moving_piece = None
+
+        elif event.type == MOUSEMOTION and self.moving_piece:
+            self.moving_piece.rect.move_ip(event.rel)
+
+    def _draw_game(self, events: List[pg.Event]) -> List[pg.Rect]:
+        """draws the frame and returns the changed areas of the screen"""
+        below, above = self._get_scene()
+        if not self.dirty_rects:
+            self.screen.blit(self.background, (0, 0))
+            for _, image, rect in below:
+                self.screen.blit(image, rect)
+            # buttons
+            pgw.update(events)
+            for _, image, rect in above:
+                self.screen.blit(image, rect)
+            return [self.screen.get_rect()]
+
+        # only redraw what changed since the last frame
+        drawn = {(key, tuple(rect)) for key, _, rect in below + above}
+        widgets = self._get_widget_rects()
+        if self.drawn is None:
+            dirty = [self.screen.get_rect()]
+        else:
+            dirty = [pg.Rect(rect) for _, rect in drawn ^ self.drawn]
+            if events:
+                # widgets only change on input
+                dirty.extend(widgets + self.drawn_widgets)
+        self.drawn = drawn
+        self.drawn_widgets = widgets
+
+        # buttons listen to the events, they are drawn below
+        self.screen.set_clip(pg.Rect(0, 0, 0, 0))
+        pgw.update(events)
+
+        dirty = _merge_rects(dirty)
+        for area in dirty:
+            self.screen.set_clip(area)
+            self.screen.blit(self.background, area, area)
+            for _, image, rect in below:
+                self.screen.blit(image, rect)
+            for widget in WidgetHandler.getWidgets():
+                widget.draw()
+            for _, image, rect in above:
+                self.screen.blit(image, rect)
+        self.screen.set_clip(None)
+        return dirty
+
+    def _get_scene(self) -> Tuple[List[SCENE_ITEM], List[SCENE_ITEM]]:
+        """
+        everything drawn on the background below and above the widgets as (key, image, rect),
+        the key identifies the content of the image
+        """
+        below: List[SCENE_ITEM] = []
+        above: List[SCENE_ITEM] = []
+
+        # pieces
+        for piece in self.pieces:
+            below.append((id(piece.image), piece.image, piece.rect))
+
+        # last move
+        if self.last_move:
+            removing = self.status in (GameStatus.PLACING_REMOVING, GameStatus.MOVING_REMOVING)
+            if (self.player == Player.BLACK) ^ removing:
+                image = self.white_piece_img_last
+            else:
+                image = self.black_piece_img_last
+            for pos in self.last_move:
+                below.append(_centered(self.yellow_circle, pos))
+            below.append(_centered(image, self.last_move[0]))
+
+        if self.last_remove:
+            if self.player == Player.WHITE:
+                image = self.white_piece_img_last
+            else:
+                image = self.black_piece_img_last
+            below.append(_centered(self.red_circle, self.last_remove))
+            below.append(_centered(image, self.last_remove))
+
+        # Action
+        if pg.font:
+            text = _render_text(self.action.value, _FONT_SIZE, (0, 255, 0))
+            below.append((self.action.value, text, text.get_rect(centerx=517, centery=25)))
+
+        # Players turn
+        if pg.font:
+            text = _render_text("Player:", _FONT_SIZE, (0, 255, 0))
+            below.append(("Player:", text, text.get_rect(x=105, centery=25)))
+            image = self.white_piece_img_turn if self.player == Player.WHITE else self.black_piece_img_turn
+            below.append((id(image), image, image.get_rect(topleft=(183, 3))))
+
+        # ai is thinking
+        if self.ai_task is not None and pg.font:
+            thinking = 'thinking' + '.' * (pg.time.get_ticks() // 300 % 4)
+            text = _render_text(thinking, _FONT_SIZE, (0, 255, 0))
+            below.append((thinking, text, text.get_rect(x=235, centery=25)))
+
+        # chess clock
+        if self.chess_clock is not None and pg.font:
+            # below the level of the player
+            for side, centerx in ((WHITE, 50), (BLACK, 951)):
+                seconds = self.chess_clock.time_left(side)
+                clock = format_time(seconds)
+                colour = (255, 0, 0) if seconds < _CLOCK_WARNING else (0, 255, 0)
+                text = _render_text(clock, _CLOCK_FONT_SIZE, colour)
+                below.append(((side, clock), text, text.get_rect(centerx=centerx, centery=55)))
+
+        # winning
+        if self.status == GameStatus.OVER and pg.font:
+            winner = f'{self.winner.value} wins'
+            text = _render_text(winner, _WINNER_FONT_SIZE, (0, 255, 255))
+            above.append((winner, text, text.get_rect(centerx=_SIZE[0] / 2, centery=_SIZE[1] / 2 + 25)))
+
+        # mouse
+        above.append((id(self.mouse.image), self.mouse.image, self.mouse.rect))
+        return below, above
+
+    def _get_widget_rects(self) -> List[pg.Rect]:
+        rects = [pg.Rect(self.refresh_button.getX(), self.refresh_button.getY(), self.refresh_button.getWidth(),
+                         self.refresh_button.getHeight())]
+        for dropdown in (self.ai_level_white_dropdown, self.ai_level_black_dropdown):
+            rect = pg.Rect(dropdown.getX(), dropdown.getY(), dropdown.getWidth(), dropdown.getHeight())
+            if dropdown.isDropped():
+                # the choices are below the head
+                rect.height *= len(_AI_LEVEL_CHOICES) + 1
+            rects.append(rect)
+        return rects
+
+    def _set_ai_level(self, player: Player) -> None:
+        # a running search is restarted with the new level
+        self._cancel_ai()
+        if player == Player.WHITE:
+            self.ai_level_white = self.ai_level_white_dropdown.getSelected()
+        if player == Player.BLACK:
+            self.ai_level_black = self.ai_level_black_dropdown.getSelected()
+
+    def get_field(self, coords: COORDINATES) -> Piece | Empty:
+        r, x, y = coords
+        return self.board[r][x][y]
+
+    def set_field(self, coords: COORDINATES, value: Piece | Empty):
+        r, x, y = coords
+        self.board[r][x][y] = value
+
+    def place_piece(self, dest: COORDINATES, player: Player, index: int = None) -> None:
+        check_access(dest)
+
+        if isinstance(self.get_field(dest), Piece):
+            raise IllegalMove('Field is occupied.')
+
+        empty_field: Empty = self.get_field(dest)
+
+        bank = self.piece_bank_white if player == Player.WHITE else self.piece_bank_black
+        if index:
+            if not isinstance(bank[index], Piece):
+                raise IllegalMove("There is no piece!")
+            if player and bank[index].player != player:
+                raise IllegalMove("That's not your piece")
+        else:
+            index = 0
+            for i in range(9):
+                if isinstance(bank[i], Piece) and (player is None or bank[i].player == player):
+                    index = i
+                    break
+
+        piece = bank[index]
+        bank[index] = empty_field
+        empty_field.on_board = False
+        empty_field.position = index
+        pos = _POSITIONS_BANK_WHITE if player == Player.WHITE else _POSITIONS_BANK_BLACK
+        empty_field.rect.center = pos[index]
+        empty_field.player = player
+
+        if not piece:
+            raise IllegalMove("You have already placed all your pieces.")
+        piece.status = PieceStatus.BOARD
+        piece.set_position(dest)
+        self.set_field(dest, piece)
+
+    def _swap(self, src: COORDINATES, dest: COORDINATES) -> None:
+        sx, sy, sz = src
+        dx, dy, dz = dest
+        if self.board[sx][sy][sz]:
+            self.board[sx][sy][sz].set_position(dest)
+        if self.board[dx][dy][dz]:
+            self.board[dx][dy][dz].set_position(src)
+        self.board[sx][sy][sz], self.board[dx][dy][dz] = self.board[dx][dy][dz], self.board[sx][sy][sz]
+
+    def _move_piece(self, src: COORDINATES, dest: COORDINATES, player: Player = None) -> None:
+        if src[1] == src[2] == 1 or dest[1] == dest[2] == 1:
+            raise AccessIllegalField("You can't access the \"middle\" field")
+        piece = self.get_field(src)
+        if player and piece.player != player:
+            raise IllegalMove('Not your piece.')
+
+        if isinstance(self.get_field(dest), Piece):
+            raise IllegalMove('Field is occupied.')
+        self._swap(src, dest)
+
+    def remove_piece(self, coords: COORDINATES, player: Player = None, index: int = None) -> None:
+        check_access(coords)
+
+        piece = self.get_field(coords)
+        if not piece:
+            raise IllegalMove('Field is empty.')
+        if player and piece.player != player:
+            raise IllegalMove("Don't remove your piece.")
+
+        piece.status = PieceStatus.REMOVED
+
+        # put in opponents bank
+        bank = self.piece_bank_white if player == Player.BLACK else self.piece_bank_black
+        bank_pos = _POSITIONS_BANK_WHITE if player == Player.BLACK else _POSITIONS_BANK_BLACK
+        if index:
+            if isinstance(bank[index], Piece):
+                raise IllegalMove("Field is occupied")
+        else:
+            for i in range(9):
+                if isinstance(bank[i], Empty):
+                    index = i
+                    break
+        empty_field = bank[index]
+        bank[index] = piece
+        piece.rect.center = bank_pos[index]
+
+        if not empty_field:
+            raise FatalError('bank field is not defined correctly')
+
+        self.set_field(coords, empty_field)
+        empty_field.on_board = True
+        empty_field.set_position(coords)
+        empty_field.rect.center = _get_board_position(coords)
+        empty_field.player = None
+
+    def get_board_as_str(self) -> str:
+        """returns a str representation of the board"""
+        return board_str(*self.state.position.pieces)
+
+    def print_board(self) -> None:
+        """prints a str representation of the board"""
+        print(self.get_board_as_str())
+
+
+@functools.lru_cache(maxsize=None)
+def _get_font(size: int) -> pg.font.Font:
+    return pg.font.Font(None, size)
+
+
+@functools.lru_cache(maxsize=_TEXT_CACHE_SIZE)
+def _render_text(text: str, size: int, colour: Tuple[int, int, int]) -> pg.Surface:
+    """most texts stay the same for many frames, so they are only rendered once"""
+    return _get_font(size).render(text, True, colour)
+
+
+def _coalesce_motion(events: List[pg.Event]) -> List[pg.Event]:
+    """merges runs of MOUSEMOTION events into one event with the last position and the whole movement"""
+    res: List[pg.Event] = []
+    for event in events:
+        if event.type == MOUSEMOTION and res and res[-1].type == MOUSEMOTION:
+            last = res[-1]
+            rel = (last.rel[0] + event.rel[0], last.rel[1] + event.rel[1])
+            res[-1] = pg.event.Event(MOUSEMOTION, pos=event.pos, rel=rel, buttons=event.buttons,
+                                     touch=getattr(event, 'touch', False))
+        else:
+            res.append(event)
+    return res
+
+
+def _centered(image: pg.Surface, pos: SCREEN_COORDINATES) -> SCENE_ITEM:
+    return id(image), image, image.get_rect(center=pos)
+
+
+def _merge_rects(rects: List[pg.Rect]) -> List[pg.Rect]:
+    """merges overlapping rects, so no area is drawn twice"""
+    res: List[pg.Rect] = []
+    for rect in rects:
+        i = rect.collidelist(res)
+        while i != -1:
+            rect = rect.union(res.pop(i))
+            i = rect.collidelist(res)
+        res.append(rect)
+    return res
+
+
+def _get_board_position(coords: COORDINATES) -> SCREEN_COORDINATES:
+    r, x, y = coords
+    return _POSITIONS_BOARD[r][x][y]
+
+
+def _load_sound(path):
+    class NoneSound:
+        def play(self):
+            pass
+
+    if not pg.mixer or not pg.mixer.get_init():
+        return NoneSound()
+
+    sound = pg.mixer.Sound(path)
+
+    return sound
+
+
+class _HitGrid:
+    """
+    Maps a pixel to the board point or bank slot around it. Every cell of the grid lists the few slots in reach of
+    its pixels, so a lookup only checks these instead of all sprites.
+    """
+
+    def __init__(self, slots: List[Tuple[SLOT, SCREEN_COORDINATES]], radius: float, cell: int = _HIT_CELL):
+        """radius: the largest radius of a lookup"""
+        self.cell = cell
+        self.columns = -(-_SIZE[0] // cell)
+        self.rows = -(-_SIZE[1] // cell)
+        self.cells: List[List[Tuple[SLOT, SCREEN_COORDINATES]]] = [[] for _ in range(self.columns * self.rows)]
+        for slot, (sx, sy) in slots:
+            for row in range(max(0, int((sy - radius) // cell)), min(self.rows, int((sy + radius) // cell) + 1)):
+                for column in range(max(0, int((sx - radius) // cell)),
+                                    min(self.columns, int((sx + radius) // cell) + 1)):
+                    # distance from the slot to the nearest pixel of the cell
+                    dx = max(column * cell - sx, 0, sx - (column + 1) * cell)
+                    dy = max(row * cell - sy, 0, sy - (row + 1) * cell)
+                    if dx * dx + dy * dy <= radius * radius:
+                        self.cells[row * self.columns + column].append((slot, (sx, sy)))
+
+    def get(self, pos: SCREEN_COORDINATES, radius: float) -> SLOT | None:
+        """the slot within radius of pos"""
+        x, y = pos
+        if not (0 <= x < _SIZE[0] and 0 <= y < _SIZE[1]):
+            return None
+        for slot, (sx, sy) in self.cells[y // self.cell * self.columns + x // self.cell]:
+            if (x - sx) ** 2 + (y - sy) ** 2 <= radius * radius:
+                return slot
+        return None
+
+
+_HIT_GRID = _HitGrid(
+    [((None, coords), _get_board_position(coords)) for coords in POINTS] +
+    [((Player.WHITE, i), pos) for i, pos in enumerate(_POSITIONS_BANK_WHITE)] +
+    [((Player.BLACK, i), pos) for i, pos in enumerate(_POSITIONS_BANK_BLACK)],
+    max(_PICK_RADIUS, _DROP_RADIUS),
+)
@@ -0,0 +1 @@
+"""pygame free engine of the mill game"""
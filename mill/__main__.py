@@ -0,0 +1,192 @@
+"""
+headless entry point for analysis, self-play and benchmarks, nothing here imports pygame
+
+A board is given like in mill/perft.py: the rings from outside to inside joined by '/', every ring in the order of
+POINTS with w, b or . for an empty point.
+
+    python -m mill analyse
+    python -m mill analyse 'ww.b..../...b.w../b.......' --hand 6 6 --depth 6
+    python -m mill selfplay 3 2 --games 4
+    python -m mill startup --level 3
+    python -m mill calibrate --levels 1-7 --games 4
+"""
+from __future__ import annotations
+
+import time
+
+# the startup benchmark measures the imports from here
+_START = time.perf_counter()
+
+import argparse  # noqa: E402
+import statistics  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+from typing import List, Optional, Sequence  # noqa: E402
+
+from mill.engine import ALPHA_BETA, BACKENDS, Engine  # noqa: E402
+from mill.perft import parse  # noqa: E402
+from mill.position import BLACK, WHITE, Position  # noqa: E402
+from mill.search import LEVELS, Search, SearchLimits  # noqa: E402
+from mill.tablebase import LOSS, TABLEBASE_DIR, WIN, Tablebase  # noqa: E402
+from mill.timecontrol import is_critical  # noqa: E402
+from mill.tui import format_move, render  # noqa: E402
+
+
+def analyse(position: Position, limits: SearchLimits, tablebase_dir: str | None = TABLEBASE_DIR) -> None:
+    print(render(position))
+    print(f'{"white" if position.turn == WHITE else "black"} to move')
+    tablebase = Tablebase(tablebase_dir) if tablebase_dir is not None else None
+    if tablebase is not None:
+        value = tablebase.probe(position)
+        if value is not None:
+            result = 'win' if value[0] == WIN else 'loss' if value[0] == LOSS else 'draw'
+            print(f'tablebase: {result} for the side to move, {value[1]} plies to the end')
+    result = Search(tablebase=tablebase).run(position, limits)
+    move = '-' if result.move is None else format_move(result.move)
+    print(f'best move {move}, score {result.score}, depth {result.depth}, {result.nodes} nodes in '
+          f'{result.time:.3f}s ({result.nodes / max(result.time, 1e-9):,.0f} nodes/s)')
+
+
+def selfplay(white: int, black: int, games: int, opening_plies: int, seed: int) -> None:
+    # the process pool of the tournament isn't needed for the other commands
+    from mill.tournament import play_game
+
+    engines = [Engine(white, seed=seed), Engine(black, seed=seed + 1)]
+    results = {WHITE: 0, BLACK: 0, None: 0}
+    for game in range(games):
+        start = time.perf_counter()
+        winner, plies, times = play_game(engines, opening_plies, seed + game)
+        results[winner] += 1
+        result = 'draw' if winner is None else ('white' if winner == WHITE else 'black') + ' wins'
+        moves = len(times[WHITE]) + len(times[BLACK])
+        average = (sum(times[WHITE]) + sum(times[BLACK])) / max(moves, 1)
+        print(f'game {game + 1}: {result} after {plies} plies, {average * 1000:.1f} ms per move, '
+              f'{time.perf_counter() - start:.1f}s')
+    print(f'white {results[WHITE]}, black {results[BLACK]}, draws {results[None]}')
+
+
+def first_move(level: int) -> None:
+    """prints the times (ms) of the imports, the engine and the first move, measured in this process"""
+    imported = time.perf_counter()
+    engine = Engine(level, book_file=None)
+    created = time.perf_counter()
+    engine.get_move(Position())
+    done = time.perf_counter()
+    print((imported - _START) * 1000, (created - imported) * 1000, (done - created) * 1000, 'pygame' in sys.modules)
+
+
+def startup(level: int, runs: int) -> None:
+    """starts fresh interpreters that play one move and reports the times"""
+    rows: List[List[float]] = []
+    pygame = False
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-m', 'mill', 'first-move', '--level', str(level)], check=True,
+                             capture_output=True, text=True).stdout.split()
+        total = (time.perf_counter() - start) * 1000
+        rows.append([float(value) for value in out[:3]] + [total])
+        pygame |= out[3] == 'True'
+    for i, name in enumerate(('imports', 'engine', 'first move', 'process start to first move')):
+        values = [row[i] for row in rows]
+        print(f'{name:<28} {statistics.median(values):8.1f} ms median, {min(values):8.1f} ms best')
+    print(f'pygame imported: {"yes" if pygame else "no"}')
+
+
+def calibrate(levels: Sequence[int], games: int, opening_plies: int, seed: int, backend: str = ALPHA_BETA) -> None:
+    """
+    plays games of every level against itself and reports the latencies of the moves (book and tablebase moves
+    included, like a player sees them) against the time limit of the level
+    """
+    from mill.tournament import play_game
+
+    print(f'{"level":>5} {"moves":>6} {"median":>8} {"p95":>8} {"max":>8} {"limit":>8} {"nodes":>8} {"critical":>8}')
+    for level in levels:
+        engines = [Engine(level, seed=seed, backend=backend), Engine(level, seed=seed + 1, backend=backend)]
+        times: List[float] = []
+        positions: List[Position] = []
+        for game in range(games):
+            _, _, game_times = play_game(engines, opening_plies, seed + game, record=positions)
+            times.extend(game_times[WHITE] + game_times[BLACK])
+        if len(times) < 2:
+            continue
+        nodes = (engines[0].nodes + engines[1].nodes) / len(times)
+        critical = sum(map(is_critical, positions)) / len(positions)
+        p95 = statistics.quantiles(times, n=20)[-1]
+        limit = LEVELS[min(level, max(LEVELS))].time
+        print(f'{level:>5} {len(times):>6} {statistics.median(times) * 1000:>6.0f}ms {p95 * 1000:>6.0f}ms '
+              f'{max(times) * 1000:>6.0f}ms {limit * 1000:>6.0f}ms {nodes:>8.0f} {critical:>8.0%}')
+
+
+def _parse_levels(text: str) -> List[int]:
+    """1-7 or 1,3,5"""
+    res: List[int] = []
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        res.extend(range(int(first), int(last or first) + 1))
+    return res
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m mill', description='mill engine without a window')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parser_analyse = commands.add_parser('analyse', help='search a position')
+    parser_analyse.add_argument('board', nargs='?', default='......../......../........')
+    parser_analyse.add_argument('--turn', choices=('w', 'b'), default='w', help='side to move (default: w)')
+    parser_analyse.add_argument('--hand', type=int, nargs=2, default=None, metavar=('WHITE', 'BLACK'),
+                                help='pieces in hand (default: 9 9 for the empty board, else 0 0)')
+    parser_analyse.add_argument('--level', type=int, default=5, help='search budget of a level (default: 5)')
+    parser_analyse.add_argument('--depth', type=int, default=None, help='search depth, overrides the level')
+    parser_analyse.add_argument('--time', type=float, default=None, help='seconds, overrides the level')
+    parser_analyse.add_argument('--nodes', type=int, default=None, help='node budget, overrides the level')
+    parser_analyse.add_argument('--no-tablebase', action='store_true', help='search without the endgame tablebase')
+
+    parser_selfplay = commands.add_parser('selfplay', help='let two levels play each other')
+    parser_selfplay.add_argument('white', type=int, help='level of white')
+    parser_selfplay.add_argument('black', type=int, help='level of black')
+    parser_selfplay.add_argument('--games', type=int, default=1, help='number of games (default: 1)')
+    parser_selfplay.add_argument('--opening-plies', type=int, default=2, help='random plies at the start (default: 2)')
+    parser_selfplay.add_argument('--seed', type=int, default=0, help='seed of the random openings (default: 0)')
+
+    parser_startup = commands.add_parser('startup', help='measure the time from the process start to the first move')
+    parser_startup.add_argument('--level', type=int, default=3, help='level of the first move (default: 3)')
+    parser_startup.add_argument('--runs', type=int, default=5, help='number of fresh processes (default: 5)')
+
+    parser_calibrate = commands.add_parser('calibrate', help='measure the move latencies of the levels')
+    parser_calibrate.add_argument('--levels', type=_parse_levels, default=list(LEVELS),
+                                  help='levels like 1-7 or 2,5 (default: all)')
+    parser_calibrate.add_argument('--games', type=int, default=2, help='games of every level (default: 2)')
+    parser_calibrate.add_argument('--opening-plies', type=int, default=4,
+                                  help='random plies at the start (default: 4)')
+    parser_calibrate.add_argument('--seed', type=int, default=0, help='seed of the random openings (default: 0)')
+    parser_calibrate.add_argument('--backend', choices=BACKENDS, default=ALPHA_BETA,
+                                  help=f'search of the ai (default: {ALPHA_BETA})')
+
+    # the child process of startup
+    parser_first_move = commands.add_parser('first-move')
+    parser_first_move.add_argument('--level', type=int, default=3)
+
+    args = parser.parse_args(argv)
+    if args.command == 'analyse':
+        hand = args.hand
+        if hand is None:
+            hand = (9, 9) if args.board.strip('./') == '' else (0, 0)
+        position = parse(args.board, WHITE if args.turn == 'w' else BLACK, hand)
+        limits = LEVELS[min(max(args.level, 1), max(LEVELS))]
+        # an explicit depth, time or node budget replaces the whole budget of the level
+        explicit = args.depth is not None or args.time is not None or args.nodes is not None
+        limits = SearchLimits(args.depth if args.depth is not None else limits.depth,
+                              args.time if explicit else limits.time, args.nodes if explicit else limits.nodes)
+        analyse(position, limits, None if args.no_tablebase else TABLEBASE_DIR)
+    elif args.command == 'selfplay':
+        selfplay(args.white, args.black, args.games, args.opening_plies, args.seed)
+    elif args.command == 'startup':
+        startup(args.level, args.runs)
+    elif args.command == 'calibrate':
+        calibrate(args.levels, args.games, args.opening_plies, args.seed, args.backend)
+    elif args.command == 'first-move':
+        first_move(args.level)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+vectorized positions: mill flags, mobility, legal moves and the static evaluation of many positions at once
+
+A PositionBatch holds N positions as arrays, the two 24-bit masks of the pieces (N x 2, see mill/position.py), the side
+to move and the pieces in hand. Every method computes its result for the whole batch in array operations, the
+results equal the scalar code of Position and mill/evaluation.py. Tools that process positions by the hundred
+thousand (tuning, checking tablebases, analysing game logs) use it, the search keeps the scalar code. Only this
+module and the tuner need numpy, it is installed with requirements-tools.txt.
+
+The benchmark checks the batch against the scalar code on random positions and compares the throughput:
+    python -m mill.batch
+    python -m mill.batch --positions 1000000 --scalar 20000
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    # the game and the terminal front-end run without numpy
+    raise ImportError(f'{__name__} needs numpy: pip install -r requirements-tools.txt') from None
+
+from mill.evaluation import WEIGHTS, evaluate, features
+from mill.position import BLACK, WHITE, Position
+from mill.topology import ALL_POINTS, MILLS, NEIGHBOURS, POINT_MILLS, POINTS
+
+_MILLS = np.array(MILLS, dtype=np.uint32)
+_NEIGHBOURS = np.array(NEIGHBOURS, dtype=np.uint32)
+_BITS = np.array([1 << i for i in range(len(POINTS))], dtype=np.uint32)
+# index in MILLS of the two mills through every point
+_POINT_MILLS = np.array([[MILLS.index(mill) for mill in mills] for mills in POINT_MILLS], dtype=np.intp)
+# the other two points of the two mills through every point (24 x 2)
+_OTHERS = np.array([[mill & ~(1 << i) for mill in mills] for i, mills in enumerate(POINT_MILLS)], dtype=np.uint32)
+_ALL = np.uint32(ALL_POINTS)
+# sources that don't break the mill: all points but the other two of the mill
+_OPEN = ~_OTHERS & _ALL
+
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    """number of set bits of every mask"""
+    return np.bitwise_count(masks).astype(np.int32)
+
+
+class PositionBatch:
+    __slots__ = ('pieces', 'turn', 'hand')
+
+    def __init__(self, pieces: np.ndarray, turn: np.ndarray, hand: np.ndarray):
+        """
+        pieces: N x 2 masks of white and black
+        turn: N sides to move
+        hand: N x 2 pieces in hand of white and black
+        """
+        self.pieces = np.asarray(pieces, dtype=np.uint32).reshape(-1, 2)
+        self.turn = np.asarray(turn, dtype=np.int8)
+        self.hand = np.asarray(hand, dtype=np.int8).reshape(-1, 2)
+
+    @classmethod
+    def from_positions(cls, positions: Iterable[Position]) -> PositionBatch:
+        rows = [(pos.pieces[WHITE], pos.pieces[BLACK], pos.turn, pos.hand[WHITE], pos.hand[BLACK])
+                for pos in positions]
+        data = np.array(rows, dtype=np.int64).reshape(-1, 5)
+        return cls(data[:, :2], data[:, 2], data[:, 3:])
+
+    @classmethod
+    def random(cls, n: int, seed: int = 0) -> PositionBatch:
+        """n random positions with 0-9 pieces of each side on the board or in hand, not all of them reachable"""
+        rng = np.random.default_rng(seed)
+        on_board = rng.integers(0, 10, (n, 2))
+        hand = rng.integers(0, 10 - on_board)
+        # a random order of the points, white gets the first points and black the next ones
+        rank = np.argsort(rng.random((n, len(POINTS))), axis=1).astype(np.int64)
+        white = rank < on_board[:, :1]
+        black = ~white & (rank < on_board[:, :1] + on_board[:, 1:])
+        pieces = np.stack([(white * _BITS).sum(axis=1), (black * _BITS).sum(axis=1)], axis=1)
+        return cls(pieces, rng.integers(0, 2, n), hand)
+
+    def __len__(self) -> int:
+        return len(self.turn)
+
+    def __getitem__(self, i: int) -> Position:
+        white, black = self.pieces[i]
+        return Position(int(white), int(black), int(self.turn[i]), [int(h) for h in self.hand[i]])
+
+    def positions(self) -> List[Position]:
+        return [self[i] for i in range(len(self))]
+
+    def side_masks(self, side: np.ndarray | int) -> Tuple[np.ndarray, np.ndarray]:
+        """pieces of side and of its opponent, side is a side or one side per position"""
+        side = np.broadcast_to(np.asarray(side, dtype=np.intp), self.turn.shape)
+        rows = np.arange(len(self))
+        return self.pieces[rows, side], self.pieces[rows, 1 - side]
+
+    def _hand(self, side: np.ndarray | int) -> np.ndarray:
+        side = np.broadcast_to(np.asarray(side, dtype=np.intp), self.turn.shape)
+        return self.hand[np.arange(len(self)), side]
+
+    def empty(self) -> np.ndarray:
+        return _ALL & ~(self.pieces[:, 0] | self.pieces[:, 1])
+
+    def is_flying(self, side: np.ndarray | int) -> np.ndarray:
+        own, _ = self.side_masks(side)
+        return (self._hand(side) == 0) & (popcount(own) == 3)
+
+    def mill_flags(self, side: np.ndarray | int) -> np.ndarray:
+        """N x 16 closed mills of side in the order of MILLS"""
+        own, _ = self.side_masks(side)
+        return (own[:, None] & _MILLS) == _MILLS
+
+    def mill_points(self, side: np.ndarray | int) -> np.ndarray:
+        """masks of the pieces of side that are part of a mill"""
+        return np.bitwise_or.reduce(np.where(self.mill_flags(side), _MILLS, np.uint32(0)), axis=1)
+
+    def removable(self, side: np.ndarray | int) -> np.ndarray:
+        """masks of the pieces of side that can be removed after a mill (empty if all of them are in mills)"""
+        own, _ = self.side_masks(side)
+        return own & ~self.mill_points(side)
+
+    def mobility(self, side: np.ndarray | int) -> np.ndarray:
+        """N x 24 number of adjacent empty points of every piece of side (0 for other points)"""
+        own, _ = self.side_masks(side)
+        return popcount(_NEIGHBOURS & self.empty()[:, None]) * ((own[:, None] & _BITS) != 0)
+
+    def destinations(self) -> np.ndarray:
+        """
+        N x 24 masks of the legal destinations of every point for the side to move (like Position.destinations)
+        all of them are empty while the side to move is placing, see placements
+        """
+        own, _ = self.side_masks(self.turn)
+        empty = self.empty()[:, None]
+        res = np.where(self.is_flying(self.turn)[:, None], empty, _NEIGHBOURS & empty)
+        moving = (self._hand(self.turn) == 0)[:, None]
+        return np.where(moving & ((own[:, None] & _BITS) != 0), res, np.uint32(0))
+
+    def placements(self) -> np.ndarray:
+        """masks of the points the side to move can place a piece on (empty while moving)"""
+        return np.where(self._hand(self.turn) > 0, self.empty(), np.uint32(0))
+
+    def count_moves(self) -> np.ndarray:
+        """number of legal moves of the side to move, a move with a removal is one move per removable piece"""
+        own, _ = self.side_masks(self.turn)
+        own_points = own[:, None]
+        removable = popcount(self.removable(1 - self.turn))
+        to_empty = (self.empty()[:, None] & _BITS) != 0
+        # the two mills through every destination whose other two points are already own
+        ready = [(own_points & _OTHERS[:, k]) == _OTHERS[:, k] for k in range(2)]
+        # pieces that can move to every empty point and the ones among them that close a mill there
+        sources = np.where(self.is_flying(self.turn)[:, None], own_points, _NEIGHBOURS & own_points) * to_empty
+        closing = (ready[0] * _OPEN[:, 0] | ready[1] * _OPEN[:, 1]) & sources
+        # a placement is a single source
+        placing = self._hand(self.turn)[:, None] > 0
+        sources = np.where(placing, to_empty, sources)
+        closing = np.where(placing, (ready[0] | ready[1]) & to_empty, closing)
+        mills = popcount(closing).sum(axis=1)
+        return popcount(sources).sum(axis=1) - mills + mills * np.maximum(removable, 1)
+
+    def is_lost(self) -> np.ndarray:
+        """the side to move has lost: less than 3 pieces or no legal move"""
+        own, _ = self.side_masks(self.turn)
+        count = popcount(own)
+        # no own piece has an empty neighbour
+        blocked = ~np.any(_NEIGHBOURS & self.empty()[:, None] & -((own[:, None] & _BITS) != 0).astype(np.uint32),
+                          axis=1)
+        return (self._hand(self.turn) == 0) & ((count < 3) | ((count > 3) & blocked))
+
+    def features(self, side: np.ndarray | int) -> np.ndarray:
+        """N x 6 features of side in the order of evaluation.FEATURES"""
+        own, opp = self.side_masks(side)
+        flags = self.mill_flags(side)
+        parts = popcount(own[:, None] & _MILLS)
+        open_mills = ((opp[:, None] & _MILLS) == 0) & (parts == 2)
+        double = flags[:, _POINT_MILLS].all(axis=2).sum(axis=1)
+        mobility = self.mobility(side)
+        walking = ~self.is_flying(side)
+        is_own = (own[:, None] & _BITS) != 0
+        blocked = np.where(walking, (is_own & (mobility == 0)).sum(axis=1), 0)
+        return np.stack([popcount(own) + self._hand(side), flags.sum(axis=1), open_mills.sum(axis=1), double,
+                         blocked, np.where(walking, mobility.sum(axis=1), 0)], axis=1).astype(np.int32)
+
+    def feature_differences(self) -> np.ndarray:
+        """N x 6 features of the side to move minus the ones of its opponent"""
+        return self.features(self.turn) - self.features(1 - self.turn)
+
+    def evaluate(self, weights: Sequence[int] = WEIGHTS) -> np.ndarray:
+        """static evaluations from the view of the side to move like evaluation.evaluate"""
+        return self.feature_differences() @ np.asarray(weights, dtype=np.int32)
+
+
+def _scalar(positions: Sequence[Position]) -> List[Tuple[Tuple[bool, ...], int, int, Tuple[int, ...], int]]:
+    """the results of the batch methods computed position by position"""
+    res = []
+    for pos in positions:
+        own = pos.pieces[pos.turn]
+        flags = tuple(own & mill == mill for mill in MILLS)
+        res.append((flags, len(pos.moves()), evaluate(pos), features(pos, pos.turn), pos.is_lost()))
+    return res
+
+
+def _batched(batch: PositionBatch) -> Tuple[np.ndarray, ...]:
+    return batch.mill_flags(batch.turn), batch.count_moves(), batch.evaluate(), batch.features(batch.turn), \
+        batch.is_lost()
+
+
+def benchmark(positions: int = 200_000, scalar: int = 20_000, seed: int = 0) -> bool:
+    """checks the batch against the scalar code on the first positions and prints the throughput of both"""
+    batch = PositionBatch.random(positions, seed)
+    start = time.perf_counter()
+    results = _batched(batch)
+    batch_time = time.perf_counter() - start
+
+    sample = batch.positions()[:scalar]
+    start = time.perf_counter()
+    expected = _scalar(sample)
+    scalar_time = time.perf_counter() - start
+
+    mismatches = 0
+    for i, (flags, moves, value, feats, lost) in enumerate(expected):
+        if (tuple(results[0][i]) != flags or results[1][i] != moves or results[2][i] != value
+                or tuple(results[3][i]) != feats or results[4][i] != lost):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f'mismatch at {sample[i]!r}')
+    scalar_rate = len(sample) / max(scalar_time, 1e-9)
+    batch_rate = positions / max(batch_time, 1e-9)
+    print(f'scalar {len(sample):>9} positions {scalar_time:8.3f}s {scalar_rate:>12,.0f} positions/s')
+    print(f'batch  {positions:>9} positions {batch_time:8.3f}s {batch_rate:>12,.0f} positions/s '
+          f'({batch_rate / scalar_rate:.0f}x)')
+    print('mill flags, moves, features, evaluation and lost positions equal the scalar code' if not mismatches
+          else f'{mismatches} of {len(sample)} positions differ from the scalar code')
+    return not mismatches
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='check and benchmark the vectorized positions')
+    parser.add_argument('--positions', type=int, default=200_000, help='positions of the batch (default: 200000)')
+    parser.add_argument('--scalar', type=int, default=20_000,
+                        help='positions computed and checked by the scalar code (default: 20000)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random positions (default: 0)')
+    args = parser.parse_args(argv)
+    if not benchmark(args.positions, min(args.scalar, args.positions), args.seed):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
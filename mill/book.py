@@ -0,0 +1,175 @@
+"""
+opening book for the placing phase
+
+The book maps the zobrist hash of a position (including the pieces in hand and the side to move) to the move found by
+a deep search. Only the canonical position of the 16 symmetric ones (see mill/symmetry.py) is stored.
+The builder walks the tree of the placing phase from the empty board, searches every position and follows the best
+moves of the search at every ply.
+
+file format: header (magic, version, search depth, number of entries) followed by the entries (hash, packed move)
+sorted by hash. A lookup is a binary search on the memory mapped file, so the book is never loaded into memory.
+
+build a book with
+    python -m mill.book --plies 8 --width 3 --depth 5
+"""
+from __future__ import annotations
+
+import argparse
+import mmap
+import os
+import struct
+import time
+from typing import Dict, List, Optional, Sequence
+
+from mill.position import MOVE, Position
+from mill.search import Search, SearchLimits
+from mill.symmetry import INVERSE, canonical, transform_move
+from mill.ttable import TranspositionTable
+
+BOOK_FILE = 'opening.book'
+
+_MAGIC = b'MILLBK'
+_VERSION = 2
+_HEADER = struct.Struct('<6sBBI')
+_ENTRY = struct.Struct('<QH')
+# stands for None in a packed move
+_NO_POINT = 31
+
+
+def pack_move(move: MOVE) -> int:
+    """5 bits for src, dest and rmv"""
+    src, dest, rmv = move
+    return (_NO_POINT if src is None else src) | dest << 5 | (_NO_POINT if rmv is None else rmv) << 10
+
+
+def unpack_move(value: int) -> MOVE:
+    src, dest, rmv = value & 31, value >> 5 & 31, value >> 10 & 31
+    return None if src == _NO_POINT else src, dest, None if rmv == _NO_POINT else rmv
+
+
+class Book:
+    """read only view of a book file, an empty book if the file doesn't exist"""
+
+    def __init__(self, path: str = BOOK_FILE):
+        self.path = path
+        self.depth = 0
+        self.size = 0
+        self._data: mmap.mmap | None = None
+        if os.path.isfile(path):
+            self._open(path)
+
+    def _open(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, depth, size = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f'{path} is no opening book of version {_VERSION}')
+        if len(data) != _HEADER.size + size * _ENTRY.size:
+            raise ValueError(f'{path} is corrupt')
+        self._data = data
+        self.depth = depth
+        self.size = size
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+            self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def probe(self, key: int) -> MOVE | None:
+        """move stored for a zobrist hash"""
+        data = self._data
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry_key, move = _ENTRY.unpack_from(data, _HEADER.size + mid * _ENTRY.size)
+            if entry_key == key:
+                return unpack_move(move)
+            if entry_key < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def get_move(self, position: Position) -> MOVE | None:
+        """book move of the position, None if the position isn't in the book"""
+        if not self.size or not position.is_placing():
+            return None
+        canon, t = canonical(position)
+        move = self.probe(canon.hash)
+        if move is not None:
+            move = transform_move(move, INVERSE[t])
+        # guards against hash collisions
+        if move is None or move not in position.moves():
+            return None
+        return move
+
+
+def write_book(path: str, moves: Dict[int, MOVE], depth: int) -> None:
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, depth, len(moves)))
+        for key in sorted(moves):
+            f.write(_ENTRY.pack(key, pack_move(moves[key])))
+
+
+class Builder:
+    """
+    Searches all positions of the placing phase reached by the first width moves of the search in every position.
+    The moves are ordered by the search, so the best move of the position always comes first.
+    """
+
+    def __init__(self, depth: int = 5, width: int = 3, tt_megabytes: float = 64, verbose: bool = False):
+        self.depth = depth
+        self.width = width
+        self.verbose = verbose
+        self.search = Search(TranspositionTable(tt_megabytes))
+
+    def build(self, plies: int) -> Dict[int, MOVE]:
+        """book moves of all canonical positions up to plies, keyed by their hash"""
+        start = time.perf_counter()
+        res: Dict[int, MOVE] = {}
+        level: List[Position] = [Position()]
+        for ply in range(plies):
+            nxt: List[Position] = []
+            for pos in level:
+                if not pos.is_placing() or pos.is_lost():
+                    continue
+                result = self.search.run(pos, SearchLimits(self.depth, None))
+                if result.move is None:
+                    continue
+                res[pos.hash] = result.move
+                for move in self.search.root_moves(pos)[:self.width]:
+                    child = pos.copy()
+                    child.play(move)
+                    child, _ = canonical(child)
+                    if child.hash not in res:
+                        nxt.append(child)
+            # transpositions and symmetric positions reached on different paths
+            level = list({pos.hash: pos for pos in nxt}.values())
+            self._log(f'ply {ply + 1}: {len(res)} positions', start)
+        return res
+
+    def _log(self, message: str, start: float) -> None:
+        if self.verbose:
+            print(f'{time.perf_counter() - start:8.1f}s {message}')
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='build an opening book of the mill game')
+    parser.add_argument('--plies', type=int, default=8, help='plies of the placing phase covered (default: 8)')
+    parser.add_argument('--width', type=int, default=3, help='moves followed in every position (default: 3)')
+    parser.add_argument('--depth', type=int, default=5, help='search depth of every position (default: 5)')
+    parser.add_argument('--out', default=BOOK_FILE, help=f'output file (default: {BOOK_FILE})')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    moves = Builder(args.depth, args.width, verbose=True).build(args.plies)
+    write_book(args.out, moves, args.depth)
+    print(f'wrote {len(moves)} positions to {args.out} in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""move selection of the ai levels without any dependency on pygame"""
+from __future__ import annotations
+
+import random
+import threading
+from typing import TYPE_CHECKING, Tuple
+
+from mill.book import BOOK_FILE, Book
+from mill.evaluation import WEIGHTS, WEIGHTS_FILE, load_weights
+from mill.mcts import MCTS
+from mill.position import MOVE, Position
+from mill.search import LEVELS, MAX_PLY, Search, SearchLimits
+from mill.tablebase import TABLEBASE_DIR, Tablebase
+from mill.timecontrol import move_limits
+from mill.ttable import DEPTH_PREFERRED, TranspositionTable
+
+if TYPE_CHECKING:
+    from mill.parallel import ParallelSearch
+
+
+# search backends
+ALPHA_BETA = 'alphabeta'
+MCTS_BACKEND = 'mcts'
+BACKENDS = (ALPHA_BETA, MCTS_BACKEND)
+
+
+def _within(limits: SearchLimits, budget: SearchLimits) -> bool:
+    """limits search no further and no longer than budget, a pondered move can be played without a new search"""
+    if limits.depth != budget.depth or limits.nodes != budget.nodes:
+        return False
+    if budget.time is None:
+        return True
+    return limits.time is not None and limits.time <= budget.time
+
+
+class Engine:
+    """
+    Level 0 plays random moves. The other levels play the move of the opening book or the endgame tablebase if there is
+    one and search with the budget of LEVELS otherwise, scaled by the time manager (see mill/timecontrol.py). The monte
+    carlo tree search only uses the time of the budget.
+    While the opponent thinks, ponder searches the reply to its predicted move.
+    """
+
+    def __init__(self, level: int = 0, tt_megabytes: float = 32, tt_policy: str = DEPTH_PREFERRED,
+                 workers: int = 1, deterministic: bool = False, tablebase_dir: str | None = TABLEBASE_DIR,
+                 book_file: str | None = BOOK_FILE, seed: int | None = None, weights_file: str | None = WEIGHTS_FILE,
+                 backend: str = ALPHA_BETA):
+        """
+        workers: number of processes of the search, 1 searches in this process, 0 uses all cores
+        deterministic: results of the search only depend on the position and the depth
+            (a parallel search then plays the same moves as the serial one at a fixed depth)
+        tablebase_dir: directory of the endgame tablebase (see mill/tablebase.py), None disables it
+        book_file: opening book of the placing phase (see mill/book.py), None disables it
+        seed: seed of the random moves of level 0
+        weights_file: weights of the evaluation fitted by the tuner (see mill/tune.py), None uses the default weights
+        backend: ALPHA_BETA or MCTS_BACKEND (see mill/mcts.py, always searches in this process)
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f'unknown backend {backend!r}, expected one of {BACKENDS}')
+        self.level = level
+        self.backend = backend
+        self.deterministic = deterministic
+        self.random = random.Random(seed)
+        # the transposition table is kept between moves of a game
+        self.tt = TranspositionTable(tt_megabytes, tt_policy)
+        self.tablebase = Tablebase(tablebase_dir) if tablebase_dir is not None else None
+        self.book = Book(book_file) if book_file is not None else None
+        self.weights = load_weights(weights_file) if weights_file is not None else WEIGHTS
+        # nodes (or playouts of the monte carlo tree search) of all searches
+        self.nodes = 0
+        # (position key, limits, move) found by ponder for the predicted move of the opponent
+        self._pondered: Tuple[Tuple[int, ...], SearchLimits, MOVE | None] | None = None
+        self.ponder_hits = 0
+        # the tree is reused after the reply of the opponent
+        self.mcts = MCTS(weights=self.weights, seed=seed) if backend == MCTS_BACKEND else None
+        self.parallel: ParallelSearch | None = None
+        if workers != 1 and self.mcts is None:
+            # multiprocessing is only imported by a parallel search, the serial engine starts faster without it
+            from mill.parallel import ParallelSearch
+            self.parallel = ParallelSearch(workers or None, deterministic, tt_megabytes, tablebase_dir, self.weights)
+
+    def set_level(self, level: int) -> None:
+        self.level = level
+
+    def reset(self) -> None:
+        """forget everything learned in the current game"""
+        self._pondered = None
+        self.tt.clear()
+        if self.mcts is not None:
+            self.mcts.clear()
+        if self.parallel is not None:
+            self.parallel.new_game()
+
+    def close(self) -> None:
+        """stops the worker processes of a parallel search"""
+        if self.parallel is not None:
+            self.parallel.close()
+
+    def get_move(self, position: Position, stop: threading.Event | None = None, level: int | None = None,
+                 time_left: float | None = None, increment: float = 0.0) -> MOVE | None:
+        """
+        stop: a running search returns the best move found so far once the event is set
+        level: overrides the level of the engine
+        time_left, increment: chess clock of the side to move (see mill/timecontrol.py), None plays without a clock
+        returns None if there is no legal move
+        """
+        if level is None:
+            level = self.level
+        if level <= 0:
+            moves = position.moves()
+            return self.random.choice(moves) if moves else None
+        limits = move_limits(position, LEVELS[min(level, max(LEVELS))], time_left, increment)
+        if self._pondered is not None:
+            key, pondered_limits, move = self._pondered
+            self._pondered = None
+            # a move searched with a larger budget than the clock allows now is searched again
+            if key == position.key() and _within(pondered_limits, limits):
+                self.ponder_hits += 1
+                return move
+        return self._select(position, limits, stop)
+
+    def ponder(self, position: Position, stop: threading.Event, level: int | None = None,
+               time_left: float | None = None, increment: float = 0.0) -> None:
+        """
+        searches on the time of the opponent until stop is set, position has the opponent to move
+        the move for the predicted reply of the opponent is kept for get_move, the other replies find the
+        transposition table (or the tree of the monte carlo tree search) warmed up
+        time_left, increment: chess clock of the engine, the move is searched with the budget get_move would use
+        must not run at the same time as get_move
+        """
+        if level is None:
+            level = self.level
+        self._pondered = None
+        if level <= 0 or position.is_lost():
+            return
+        if self.mcts is not None:
+            # the tree of the position is reused after the reply
+            self.mcts.run(position, stop=stop)
+            return
+        limits = LEVELS[min(level, max(LEVELS))]
+        pos = position.copy()
+        reply = self._select(pos, move_limits(pos, limits), stop)
+        if reply is None or stop.is_set():
+            return
+        pos.play(reply)
+        limits = move_limits(pos, limits, time_left, increment)
+        move = self._select(pos, limits, stop)
+        # a stopped search isn't complete
+        if stop.is_set():
+            return
+        self._pondered = pos.key(), limits, move
+        if self.parallel is None:
+            # deeper and deeper for all replies
+            search = Search(self.tt, self.deterministic, self.tablebase, self.weights)
+            search.run(position, SearchLimits(MAX_PLY, None), stop)
+
+    def _select(self, position: Position, limits: SearchLimits, stop: threading.Event | None) -> MOVE | None:
+        # precomputed opening
+        if self.book is not None:
+            move = self.book.get_move(position)
+            if move is not None:
+                return move
+
+        # perfect play in the endgame
+        if self.tablebase is not None:
+            move = self.tablebase.best_move(position)
+            if move is not None:
+                return move
+
+        if self.mcts is not None:
+            # the playouts of the time budget, a tree reused from pondering may have them already
+            visits = int(self.mcts.rate() * limits.time) if limits.time is not None else None
+            result = self.mcts.run(position, limits.time, stop, visits=visits or None)
+            self.nodes += result.playouts
+            return result.move
+        if self.parallel is not None:
+            result = self.parallel.run(position, limits, stop)
+        else:
+            # every search gets its own state, only the transposition table is shared
+            result = Search(self.tt, self.deterministic, self.tablebase, self.weights).run(position, limits, stop)
+        self.nodes += result.nodes
+        return result.move
@@ -0,0 +1,86 @@
+"""
+static evaluation of a position from the view of the side to move
+
+The weights are hand-tuned defaults or the ones fitted by the tuner (see mill/tune.py) and stored in a weights file:
+a json object with the version of the format, the names of the features and the weights plus information about
+the fit.
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Sequence, Tuple
+
+from mill.position import Position, iter_points
+from mill.topology import MILLS, NEIGHBOURS
+
+FEATURES = ('pieces', 'mills', 'open_mills', 'double_mills', 'blocked', 'mobility')
+WEIGHTS: Tuple[int, ...] = (100, 20, 12, 25, -8, 2)
+
+WEIGHTS_FILE = 'evaluation.weights'
+_VERSION = 1
+
+
+def features(position: Position, side: int) -> Tuple[int, ...]:
+    """
+    pieces: pieces on the board and in hand
+    mills: closed mills
+    open_mills: mills with two own pieces and an empty third point
+    double_mills: pieces that are part of two closed mills
+    blocked: pieces that can't move (0 while flying)
+    mobility: number of moves to adjacent empty points (0 while flying)
+    """
+    own = position.pieces[side]
+    opp = position.pieces[1 - side]
+    mills = open_mills = 0
+    in_mill = double = 0
+    for mill in MILLS:
+        part = own & mill
+        if part == mill:
+            mills += 1
+            double |= in_mill & mill
+            in_mill |= mill
+        elif not opp & mill and part.bit_count() == 2:
+            open_mills += 1
+
+    blocked = mobility = 0
+    if not position.is_flying(side):
+        empty = position.empty()
+        for point in iter_points(own):
+            n = (NEIGHBOURS[point] & empty).bit_count()
+            if n:
+                mobility += n
+            else:
+                blocked += 1
+    return own.bit_count() + position.hand[side], mills, open_mills, double.bit_count(), blocked, mobility
+
+
+def evaluate(position: Position, weights: Tuple[int, ...] = WEIGHTS) -> int:
+    side = position.turn
+    own = features(position, side)
+    opp = features(position, 1 - side)
+    return sum(w * (a - b) for w, a, b in zip(weights, own, opp))
+
+
+def load_weights(path: str = WEIGHTS_FILE) -> Tuple[int, ...]:
+    """the weights of a weights file, the default WEIGHTS if the file doesn't exist"""
+    if not os.path.isfile(path):
+        return WEIGHTS
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get('version') != _VERSION:
+        raise ValueError(f'{path} is no weights file of version {_VERSION}')
+    if tuple(data.get('features', ())) != FEATURES or len(data.get('weights', ())) != len(FEATURES):
+        raise ValueError(f'{path} has weights of other features than {FEATURES}')
+    return tuple(int(w) for w in data['weights'])
+
+
+def save_weights(weights: Sequence[int], path: str = WEIGHTS_FILE, **info: Any) -> None:
+    """info: information about the fit stored with the weights"""
+    data = {'version': _VERSION, 'features': list(FEATURES), 'weights': [int(w) for w in weights], **info}
+    # write and rename, so a starting engine never reads half a file
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+    os.replace(tmp, path)
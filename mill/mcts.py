@@ -0,0 +1,347 @@
+"""
+monte carlo tree search, the alternative to the alpha-beta search of mill/search.py
+
+Every iteration selects a path with UCT, expands the leaf and plays a fast playout from there. A random playout plays
+uniformly random moves, a heavy playout closes a mill whenever it can. Playouts end when a side has lost or after
+PLAYOUT_PLIES plies, then the static evaluation gives the expected result. The move played is the most visited one.
+
+The nodes live in a pool of flat lists that is allocated once. After a move the subtree of the new position (found
+within two plies, so it includes the reply of the opponent) is copied to the front of the other pool and the search
+goes on from there, the rest of the tree is dropped.
+
+    python -m mill.mcts
+    python -m mill.mcts --seconds 2 --random
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import threading
+import time
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from mill.evaluation import WEIGHTS, evaluate
+from mill.position import MOVE, WHITE, Position, iter_points
+from mill.topology import MILLS, NEIGHBOURS, POINT_MILLS
+
+# playouts without a winner after this many plies are scored by the evaluation (short playouts played better)
+PLAYOUT_PLIES = 8
+# expected result of an evaluation: sigmoid(EVALUATION_SCALE * evaluation)
+EVALUATION_SCALE = 0.01
+EXPLORATION = 0.4
+MAX_NODES = 500_000
+# playouts between two checks of the clock and the stop event
+_CHECK_INTERVAL = 16
+_UNEXPANDED = -1
+
+
+class MCTSResult(NamedTuple):
+    move: Optional[MOVE]
+    # visits of the move and its expected result for the side to move
+    visits: int
+    value: float
+    playouts: int
+    # nodes of the tree that were kept from the last search
+    reused: int
+    time: float
+
+
+class NodePool:
+    """struct of lists, node i is (move[i], visits[i], value[i], first[i], count[i])"""
+    __slots__ = ('move', 'visits', 'value', 'first', 'count', 'size')
+
+    def __init__(self, capacity: int):
+        self.move: List[Optional[MOVE]] = [None] * capacity
+        self.visits = [0] * capacity
+        # sum of the results for the side that made the move of the node
+        self.value = [0.0] * capacity
+        # children are stored in a block first[i]..first[i] + count[i] - 1
+        self.first = [_UNEXPANDED] * capacity
+        self.count = [0] * capacity
+        self.size = 0
+
+    def capacity(self) -> int:
+        return len(self.visits)
+
+    def allocate(self, moves: Sequence[MOVE]) -> int:
+        """returns the index of the first of the new nodes"""
+        first = self.size
+        for i, move in enumerate(moves, first):
+            self.move[i] = move
+            self.visits[i] = 0
+            self.value[i] = 0.0
+            self.first[i] = _UNEXPANDED
+            self.count[i] = 0
+        self.size += len(moves)
+        return first
+
+
+class MCTS:
+    def __init__(self, max_nodes: int = MAX_NODES, heavy: bool = True, exploration: float = EXPLORATION,
+                 weights: Tuple[int, ...] = WEIGHTS, seed: int | None = None):
+        """
+        max_nodes: capacity of the node pool, a full pool stops expanding the tree
+        heavy: heavy playouts, else random ones
+        weights: weights of the evaluation at the end of a playout
+        """
+        self.heavy = heavy
+        self.exploration = exploration
+        self.weights = weights
+        self.random = random.Random(seed)
+        # the tree and the pool for the next copy of a subtree
+        self.pool = NodePool(max_nodes)
+        self._spare = NodePool(max_nodes)
+        self.root_position: Position | None = None
+        # playouts and seconds of all searches
+        self.playouts = 0
+        self.seconds = 0.0
+
+    def clear(self) -> None:
+        """forget the tree"""
+        self.pool.size = 0
+        self.root_position = None
+
+    def rate(self) -> float:
+        """playouts per second"""
+        return self.playouts / self.seconds if self.seconds else 0.0
+
+    def run(self, position: Position, seconds: float | None = None, stop: threading.Event | None = None,
+            playouts: int | None = None, visits: int | None = None) -> MCTSResult:
+        """
+        searches until the time is up, the stop event is set, after playouts playouts or once the root has visits
+        visits (a tree reused from pondering can have them already), a search without any limit runs until the pool
+        is full
+        """
+        start = time.perf_counter()
+        deadline = None if seconds is None else start + seconds
+        reused = self._set_root(position)
+        pool = self.pool
+        if not position.moves() or position.is_lost():
+            return MCTSResult(None, 0, 0.0, 0, reused, time.perf_counter() - start)
+
+        done = 0
+        while playouts is None or done < playouts:
+            if done % _CHECK_INTERVAL == 0:
+                if deadline is not None and time.perf_counter() >= deadline or stop is not None and stop.is_set():
+                    break
+                if deadline is None and stop is None and playouts is None and pool.size >= pool.capacity():
+                    break
+                if visits is not None and pool.visits[0] >= visits:
+                    break
+            self._iterate()
+            done += 1
+        self.playouts += done
+        self.seconds += time.perf_counter() - start
+
+        first, count = pool.first[0], pool.count[0]
+        if first == _UNEXPANDED:
+            self._expand(0, position)
+            first, count = pool.first[0], pool.count[0]
+        best = max(range(first, first + count), key=lambda i: (pool.visits[i], pool.value[i]))
+        visits = pool.visits[best]
+        return MCTSResult(pool.move[best], visits, pool.value[best] / visits if visits else 0.5, done, reused,
+                          time.perf_counter() - start)
+
+    def _set_root(self, position: Position) -> int:
+        """makes the node of position the root, returns the number of nodes kept"""
+        root = None
+        if self.root_position is not None and self.pool.size:
+            root = self._find(position)
+        if root is None:
+            self.pool.size = 0
+            self.pool.allocate([None])
+            self.root_position = position.copy()
+            return 0
+        if root != 0:
+            self._copy_subtree(root)
+        self.root_position = position.copy()
+        return self.pool.size
+
+    def _find(self, position: Position) -> int | None:
+        """index of the node of position among the root and the nodes of the next two plies"""
+        pool = self.pool
+        key = position.key()
+        pos = self.root_position.copy()
+        if pos.key() == key:
+            return 0
+        if pool.first[0] == _UNEXPANDED:
+            return None
+        for child in range(pool.first[0], pool.first[0] + pool.count[0]):
+            pos.play(pool.move[child])
+            if pos.key() == key:
+                return child
+            if pool.first[child] != _UNEXPANDED:
+                for grandchild in range(pool.first[child], pool.first[child] + pool.count[child]):
+                    pos.play(pool.move[grandchild])
+                    found = pos.key() == key
+                    pos.undo(pool.move[grandchild])
+                    if found:
+                        return grandchild
+            pos.undo(pool.move[child])
+        return None
+
+    def _copy_subtree(self, root: int) -> None:
+        """copies the subtree of root to the spare pool breadth first, so every block of children stays a block"""
+        old, new = self.pool, self._spare
+        new.size = 0
+        new.allocate([None])
+        new.visits[0] = old.visits[root]
+        new.value[0] = old.value[root]
+        queue = [(root, 0)]
+        for src, dest in queue:
+            if old.first[src] == _UNEXPANDED:
+                continue
+            first, count = old.first[src], old.count[src]
+            new.first[dest] = block = new.allocate(old.move[first:first + count])
+            new.count[dest] = count
+            for i in range(count):
+                new.visits[block + i] = old.visits[first + i]
+                new.value[block + i] = old.value[first + i]
+                queue.append((first + i, block + i))
+        self.pool, self._spare = new, old
+
+    def _expand(self, node: int, pos: Position) -> bool:
+        """adds the children of node, returns False if the pool is full"""
+        pool = self.pool
+        moves = [] if pos.is_lost() else pos.moves()
+        if pool.size + len(moves) > pool.capacity():
+            return False
+        self.random.shuffle(moves)
+        pool.first[node] = pool.allocate(moves)
+        pool.count[node] = len(moves)
+        return True
+
+    def _iterate(self) -> None:
+        pool = self.pool
+        pos = self.root_position.copy()
+        node = 0
+        path = [0]
+        # selection
+        while pool.first[node] != _UNEXPANDED and pool.count[node]:
+            node = self._select(node)
+            pos.play(pool.move[node])
+            path.append(node)
+        # expansion of a leaf that was already visited (or the root)
+        if pool.first[node] == _UNEXPANDED and (pool.visits[node] or node == 0) and self._expand(node, pos) \
+                and pool.count[node]:
+            node = self._select(node)
+            pos.play(pool.move[node])
+            path.append(node)
+
+        white_score = self._playout(pos)
+        # the side that moved into the first node of the path is the side to move at the root
+        mover = self.root_position.turn
+        pool.visits[0] += 1
+        for node in path[1:]:
+            pool.visits[node] += 1
+            pool.value[node] += white_score if mover == WHITE else 1 - white_score
+            mover = 1 - mover
+
+    def _select(self, node: int) -> int:
+        """the child with the highest upper confidence bound, unvisited children first"""
+        pool = self.pool
+        visits, value = pool.visits, pool.value
+        first = pool.first[node]
+        factor = self.exploration * math.sqrt(math.log(max(visits[node], 1)))
+        best, best_bound = first, -1.0
+        for child in range(first, first + pool.count[node]):
+            n = visits[child]
+            if not n:
+                return child
+            bound = value[child] / n + factor / math.sqrt(n)
+            if bound > best_bound:
+                best, best_bound = child, bound
+        return best
+
+    def _playout(self, pos: Position) -> float:
+        """plays until a side has lost, returns the expected result of white"""
+        rng = self.random
+        for _ in range(PLAYOUT_PLIES):
+            if pos.is_lost():
+                return 0.0 if pos.turn == WHITE else 1.0
+            pos.play(random_move(pos, rng, self.heavy))
+        if pos.is_lost():
+            return 0.0 if pos.turn == WHITE else 1.0
+        score = evaluate(pos, self.weights) if pos.turn == WHITE else -evaluate(pos, self.weights)
+        return 1 / (1 + math.exp(-EVALUATION_SCALE * score))
+
+
+def random_move(pos: Position, rng: random.Random, heavy: bool = False) -> MOVE:
+    """
+    a random legal move without generating all moves, the position must not be lost
+    heavy: closes a mill if possible
+    """
+    side = pos.turn
+    own = pos.pieces[side]
+    empty = pos.empty()
+    placing = pos.hand[side] > 0
+    flying = not placing and own.bit_count() == 3
+    steps = _closing_steps(own, empty, placing, flying) if heavy else []
+    if steps:
+        src, dest = rng.choice(steps)
+    elif placing or flying:
+        # every empty point can be reached
+        src = None if placing else rng.choice(list(iter_points(own)))
+        dest = rng.choice(list(iter_points(empty)))
+    else:
+        steps = [(src, dest) for src in iter_points(own) for dest in iter_points(NEIGHBOURS[src] & empty)]
+        src, dest = rng.choice(steps)
+    removable = pos.removable(1 - side) if _closes_mill(own, src, dest) else 0
+    return src, dest, rng.choice(list(iter_points(removable))) if removable else None
+
+
+def _closing_steps(own: int, empty: int, placing: bool, flying: bool) -> List[Tuple[Optional[int], int]]:
+    """(src, dest) of the moves that close a mill"""
+    res: List[Tuple[Optional[int], int]] = []
+    for mill in MILLS:
+        if (own & mill).bit_count() == 2 and mill & empty:
+            dest = (mill & empty).bit_length() - 1
+            if placing:
+                res.append((None, dest))
+            else:
+                # the other two pieces of the mill have to stay
+                sources = own & ~mill if flying else NEIGHBOURS[dest] & own & ~mill
+                res.extend((src, dest) for src in iter_points(sources))
+    return res
+
+
+def _closes_mill(own: int, src: int | None, dest: int) -> bool:
+    if src is not None:
+        own ^= 1 << src
+    own |= 1 << dest
+    m1, m2 = POINT_MILLS[dest]
+    return own & m1 == m1 or own & m2 == m2
+
+
+def benchmark(seconds: float = 1.0, heavy: bool = True, moves: int = 6, seed: int = 0) -> None:
+    """plays a few moves from the start with tree reuse and prints the playouts per second"""
+    mcts = MCTS(heavy=heavy, seed=seed)
+    pos = Position()
+    total_playouts = 0
+    total_time = 0.0
+    for _ in range(moves):
+        if pos.is_lost():
+            break
+        result = mcts.run(pos, seconds)
+        total_playouts += result.playouts
+        total_time += result.time
+        print(f'move {result.move}, {result.visits} visits, value {result.value:.3f}, {result.playouts} playouts in '
+              f'{result.time:.2f}s ({result.playouts / max(result.time, 1e-9):,.0f} playouts/s), '
+              f'{result.reused} nodes reused')
+        pos.play(result.move)
+    print(f'{"heavy" if heavy else "random"} playouts: {total_playouts / max(total_time, 1e-9):,.0f} playouts/s')
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='benchmark the monte carlo tree search of the mill game')
+    parser.add_argument('--seconds', type=float, default=1.0, help='seconds per move (default: 1)')
+    parser.add_argument('--moves', type=int, default=6, help='moves played from the start (default: 6)')
+    parser.add_argument('--random', action='store_true', help='random instead of heavy playouts')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the search (default: 0)')
+    args = parser.parse_args(argv)
+    benchmark(args.seconds, not args.random, args.moves, args.seed)
+
+
+if __name__ == '__main__':
+    main()
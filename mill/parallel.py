@@ -0,0 +1,187 @@
+"""
+root splitting search on a process pool
+
+Every iteration of the iterative deepening searches the first root move with a full window. The remaining root moves
+are then searched in parallel by the worker processes with the window (alpha, WIN) of the first move. Every worker keeps
+its own transposition table for the whole game.
+In deterministic mode all tables only use entries of exactly the requested depth, so for a fixed depth the result is
+the same as the one of a serial Search(exact_depth=True), no matter how the moves are scheduled on the workers.
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, List, Optional, Tuple
+
+from mill.evaluation import WEIGHTS
+from mill.position import MOVE, Position
+from mill.search import WIN, WIN_BOUND, Search, SearchLimits, SearchResult
+from mill.tablebase import Tablebase
+from mill.ttable import EXACT, TranspositionTable
+
+# seconds between two checks of the stop event of the caller
+_POLL_INTERVAL = 0.01
+
+# state of a worker process
+_worker_search: Optional[Search] = None
+_worker_stop: Any = None
+_worker_game = 0
+
+
+def _init_worker(stop: Any, tt_megabytes: float, exact_depth: bool, tablebase_dir: str | None,
+                 weights: Tuple[int, ...]) -> None:
+    global _worker_search, _worker_stop
+    tablebase = None if tablebase_dir is None else Tablebase(tablebase_dir)
+    _worker_search = Search(TranspositionTable(tt_megabytes), exact_depth, tablebase, weights)
+    _worker_stop = stop
+
+
+def _search_move(position: Position, move: MOVE, depth: int, alpha: int, time_left: float | None,
+                 game: int) -> Tuple[int | None, int]:
+    global _worker_game
+    if game != _worker_game:
+        _worker_search.tt.clear()
+        _worker_game = game
+    score = _worker_search.search_move(position, move, depth, alpha, WIN + 1, time_left, _worker_stop,
+                                       new_search=False)
+    return score, _worker_search.nodes
+
+
+class ParallelSearch:
+    def __init__(self, workers: int | None = None, deterministic: bool = False, tt_megabytes: float = 32,
+                 tablebase_dir: str | None = None, weights: Tuple[int, ...] = WEIGHTS):
+        """
+        workers: number of processes, all cores by default
+        tt_megabytes: size of the transposition table of every worker
+        tablebase_dir: the workers probe the endgame tablebase of this directory
+        weights: weights of the static evaluation of all searches
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.deterministic = deterministic
+        self.tt_megabytes = tt_megabytes
+        self.tablebase_dir = tablebase_dir
+        self.weights = weights
+        self.game = 0
+        self.nodes = 0
+        self.best: SearchResult | None = None
+        self._pool: ProcessPoolExecutor | None = None
+        self._stop: Any = None
+        self._pending: List[Future] = []
+        # a cancelled run may still be collecting its results when the next one starts
+        self._lock = threading.Lock()
+        # used for the root move order
+        self._search = Search(TranspositionTable(1), deterministic, weights=weights)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            context = mp.get_context()
+            self._stop = context.Event()
+            self._pool = ProcessPoolExecutor(self.workers, context, _init_worker,
+                                             (self._stop, self.tt_megabytes, self.deterministic,
+                                              self.tablebase_dir, self.weights))
+        # let stopped searches of the last run finish, before they can see the cleared event
+        wait(self._pending)
+        self._pending = []
+        self._stop.clear()
+        return self._pool
+
+    def new_game(self) -> None:
+        """the workers clear their transposition tables before the next search"""
+        self.game += 1
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._stop.set()
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def run(self, position: Position, limits: SearchLimits, stop: threading.Event | None = None) -> SearchResult:
+        """same as Search.run"""
+        with self._lock:
+            return self._run(position, limits, stop)
+
+    def _run(self, position: Position, limits: SearchLimits, stop: threading.Event | None) -> SearchResult:
+        start = time.perf_counter()
+        deadline = None if limits.time is None else start + limits.time
+        pool = self._get_pool()
+        self.nodes = 0
+        self.best = None
+
+        pos = position.copy()
+        moves = self._search.root_moves(pos)
+        if not moves:
+            return SearchResult(None, -WIN, 0, 0, time.perf_counter() - start)
+        best_move, best_score, completed = moves[0], 0, 0
+        if len(moves) > 1:
+            for depth in range(1, limits.depth + 1):
+                res = self._root(pool, pos, moves, depth, deadline, stop)
+                if res is None:
+                    break
+                best_score, best_move = res
+                completed = depth
+                self.best = SearchResult(best_move, best_score, depth, self.nodes, time.perf_counter() - start)
+                moves.remove(best_move)
+                moves.insert(0, best_move)
+                if abs(best_score) >= WIN_BOUND:
+                    break
+                if deadline is not None and time.perf_counter() - start > (deadline - start) / 2:
+                    break
+                # the workers don't know the nodes of each other, the budget only ends the deepening
+                if limits.nodes is not None and self.nodes > limits.nodes / 2:
+                    break
+        self._search.tt.store(pos.hash, completed, EXACT, best_score, best_move)
+        return SearchResult(best_move, best_score, completed, self.nodes, time.perf_counter() - start)
+
+    def _root(self, pool: ProcessPoolExecutor, pos: Position, moves: List[MOVE], depth: int,
+              deadline: float | None, stop: threading.Event | None) -> Tuple[int, MOVE] | None:
+        """returns None if the iteration didn't finish"""
+        first = self._collect(
+            [pool.submit(_search_move, pos, moves[0], depth, -WIN - 1, _time_left(deadline), self.game)],
+            deadline, stop)
+        if first is None:
+            return None
+        alpha = first[0]
+        futures = [pool.submit(_search_move, pos, move, depth, alpha, _time_left(deadline), self.game)
+                   for move in moves[1:]]
+        scores = self._collect(futures, deadline, stop)
+        if scores is None:
+            return None
+
+        best_score, best_move = alpha, moves[0]
+        for move, score in zip(moves[1:], scores):
+            # scores <= alpha are upper bounds, the first move with the highest score wins like in the serial search
+            if score > best_score:
+                best_score, best_move = score, move
+        return best_score, best_move
+
+    def _collect(self, futures: List[Future], deadline: float | None,
+                 stop: threading.Event | None) -> List[int] | None:
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, _POLL_INTERVAL, FIRST_COMPLETED)
+            for future in done:
+                score, nodes = future.result()
+                self.nodes += nodes
+                if score is None:
+                    # a worker ran out of time
+                    return self._abort(futures)
+            if (stop is not None and stop.is_set()) or (deadline is not None and time.perf_counter() > deadline):
+                return self._abort(futures)
+        return [future.result()[0] for future in futures]
+
+    def _abort(self, futures: List[Future]) -> None:
+        # the workers see the event at their next time check
+        self._stop.set()
+        for future in futures:
+            future.cancel()
+        self._pending.extend(futures)
+        return None
+
+
+def _time_left(deadline: float | None) -> float | None:
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.perf_counter())
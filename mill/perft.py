@@ -0,0 +1,128 @@
+"""
+perft: counts the leaf nodes of the game tree to a fixed depth
+
+The counts of the reference positions check the move generation against the values of an independent generator,
+the timing makes the tool a benchmark of the hot path (moves, play and undo). A ply is a complete turn including the
+removal after a mill.
+
+    python -m mill.perft
+    python -m mill.perft --max-depth 3 --repeat 3
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from mill.position import BLACK, MOVE, WHITE, Position
+from mill.topology import POINTS
+
+
+class Reference(NamedTuple):
+    name: str
+    # the rings from outside to inside, every ring in the order of POINTS: w, b or . for an empty point
+    board: str
+    turn: int
+    hand: Tuple[int, int]
+    # leaf nodes at depth 1, 2, ...
+    counts: Tuple[int, ...]
+
+    def position(self) -> Position:
+        return parse(self.board, self.turn, self.hand)
+
+
+# all counts agree with an independent generator on the coordinates of the board that follows the rules of the
+# original game.py (the neighbours of POSSIBLE_MOVES and its forms_mill), not with the bitboards checked here
+REFERENCES: Tuple[Reference, ...] = (
+    Reference('start', '......../......../........', WHITE, (9, 9),
+              (24, 552, 12144, 255024)),
+    Reference('placing with mills', 'ww.b..../...b.w../b.......', WHITE, (6, 6),
+              (20, 391, 7323, 132979)),
+    Reference('moving', 'bb.b.b../bw..wb../b.www.ww', WHITE, (0, 0),
+              (13, 118, 1182, 11262, 110636)),
+    Reference('flying', 'b..b.b.w/b....b.w/...bw...', WHITE, (0, 0),
+              (45, 756, 11628, 163294)),
+    Reference('all pieces in mills', 'bbb..bbb/ww..w.../...w.w..', WHITE, (0, 0),
+              (10, 50, 517, 6523, 61743)),
+)
+
+
+def parse(board: str, turn: int = WHITE, hand: Sequence[int] = (0, 0)) -> Position:
+    pieces = [0, 0]
+    for i, char in enumerate(board.replace('/', '')):
+        if char == 'w':
+            pieces[WHITE] |= 1 << i
+        elif char == 'b':
+            pieces[BLACK] |= 1 << i
+        elif char != '.':
+            raise ValueError(f'illegal point {char!r} in board {board!r}')
+    if i + 1 != len(POINTS):
+        raise ValueError(f'board {board!r} has not {len(POINTS)} points')
+    return Position(pieces[WHITE], pieces[BLACK], turn, hand)
+
+
+def perft(position: Position, depth: int) -> int:
+    """number of positions reached after exactly depth plies, games end when a side has lost"""
+    if depth <= 0:
+        return 1
+    if position.is_lost():
+        return 0
+    moves = position.moves()
+    if depth == 1:
+        return len(moves)
+    res = 0
+    for move in moves:
+        position.play(move)
+        res += perft(position, depth - 1)
+        position.undo(move)
+    return res
+
+
+def divide(position: Position, depth: int) -> Dict[MOVE, int]:
+    """perft of the positions after every move, to find the move a wrong count comes from"""
+    res = {}
+    for move in position.moves():
+        position.play(move)
+        res[move] = perft(position, depth - 1)
+        position.undo(move)
+    return res
+
+
+def run(references: Sequence[Reference] = REFERENCES, max_depth: int | None = None, repeat: int = 1) -> bool:
+    """prints count and speed of all references up to max_depth, returns False if a count is wrong"""
+    ok = True
+    total_nodes = 0
+    total_time = 0.0
+    for reference in references:
+        for depth, expected in enumerate(reference.counts, 1):
+            if max_depth is not None and depth > max_depth:
+                break
+            times: List[float] = []
+            for _ in range(repeat):
+                position = reference.position()
+                start = time.perf_counter()
+                nodes = perft(position, depth)
+                times.append(time.perf_counter() - start)
+            best = min(times)
+            total_nodes += nodes
+            total_time += best
+            status = 'ok' if nodes == expected else f'FAILED, expected {expected}'
+            ok &= nodes == expected
+            print(f'{reference.name:<20} depth {depth} {nodes:>10} nodes {best:8.3f}s '
+                  f'{nodes / max(best, 1e-9):>12,.0f} nodes/s {status}')
+    print(f'total {total_nodes} nodes in {total_time:.3f}s, {total_nodes / max(total_time, 1e-9):,.0f} nodes/s')
+    return ok
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='check and benchmark the move generation of the mill game')
+    parser.add_argument('--max-depth', type=int, default=None, help='skip deeper counts')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per count, the fastest one is reported')
+    args = parser.parse_args(argv)
+    if not run(max_depth=args.max_depth, repeat=args.repeat):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
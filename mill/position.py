@@ -0,0 +1,243 @@
+"""
+compact bitboard representation of a mill position
+
+The 24 points are numbered 0..23 in the order of POINTS, ring by ring and inside a ring in the same (x, y) order as
+the 3d board lists in game.py. A set of points is an int with bit i set for point i, so a position is just two 24-bit
+masks (white and black) plus the side to move and the pieces in hand of both players. The adjacency and the mills
+come from mill/topology.py.
+"""
+from __future__ import annotations
+
+import random
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from mill.topology import ALL_POINTS, GRID, MILLS, NEIGHBOURS, POINT_MILLS, POINTS
+
+# (src, dest, rmv): src is None while placing, rmv is None if no piece is removed
+MOVE = Tuple[Optional[int], int, Optional[int]]
+
+# sides
+WHITE = 0
+BLACK = 1
+
+
+# zobrist keys, seeded so that keys stored in files stay valid
+_random = random.Random(0x5EED)
+ZOBRIST_PIECES: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(_random.getrandbits(64) for _ in POINTS) for _side in (WHITE, BLACK)
+)
+ZOBRIST_HAND: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(_random.getrandbits(64) for _ in range(10)) for _side in (WHITE, BLACK)
+)
+ZOBRIST_TURN = _random.getrandbits(64)
+del _random
+
+# the empty board as drawn by board_str, the columns of the grid (see mill/topology.py) are 3 characters apart
+_BOARD = (
+    '┌────────┬────────┐',
+    '│  ┌─────┼─────┐  │',
+    '│  │  ┌──┴──┐  │  │',
+    '├──┼──┤     ├──┼──┤',
+    '│  │  └──┬──┘  │  │',
+    '│  └─────┼─────┘  │',
+    '└────────┴────────┘',
+)
+
+
+def iter_points(mask: int) -> Iterator[int]:
+    """yields the indices of all set bits"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Position:
+    __slots__ = ('pieces', 'hand', 'turn', 'hash')
+
+    def __init__(self, white: int = 0, black: int = 0, turn: int = WHITE, hand: Sequence[int] = (9, 9)):
+        self.pieces = [white, black]
+        self.hand = list(hand)
+        self.turn = turn
+        # zobrist hash, updated incrementally by play and undo
+        self.hash = self.compute_hash()
+
+    @classmethod
+    def from_cells(cls, cells: Sequence[Sequence[Sequence[Optional[int]]]], turn: int = WHITE,
+                   hand: Sequence[int] = (0, 0)) -> Position:
+        """encodes a 3d board list holding WHITE, BLACK or None"""
+        pieces = [0, 0]
+        for i, (r, x, y) in enumerate(POINTS):
+            side = cells[r][x][y]
+            if side is not None:
+                pieces[side] |= 1 << i
+        return cls(pieces[WHITE], pieces[BLACK], turn, hand)
+
+    def copy(self) -> Position:
+        return Position(self.pieces[WHITE], self.pieces[BLACK], self.turn, self.hand)
+
+    def compute_hash(self) -> int:
+        res = ZOBRIST_TURN if self.turn == BLACK else 0
+        for side in (WHITE, BLACK):
+            for point in iter_points(self.pieces[side]):
+                res ^= ZOBRIST_PIECES[side][point]
+            res ^= ZOBRIST_HAND[side][self.hand[side]]
+        return res
+
+    def key(self) -> Tuple[int, int, int, int, int]:
+        return self.pieces[WHITE], self.pieces[BLACK], self.turn, self.hand[WHITE], self.hand[BLACK]
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Position) and self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def __repr__(self) -> str:
+        return 'Position(white={:#08x}, black={:#08x}, turn={}, hand={})'.format(
+            self.pieces[WHITE], self.pieces[BLACK], self.turn, tuple(self.hand))
+
+    def empty(self) -> int:
+        return ALL_POINTS & ~(self.pieces[WHITE] | self.pieces[BLACK])
+
+    def owner(self, point: int) -> int | None:
+        if self.pieces[WHITE] >> point & 1:
+            return WHITE
+        if self.pieces[BLACK] >> point & 1:
+            return BLACK
+        return None
+
+    def count(self, side: int) -> int:
+        """pieces of side on the board"""
+        return self.pieces[side].bit_count()
+
+    def is_placing(self) -> bool:
+        return self.hand[self.turn] > 0
+
+    def is_flying(self, side: int) -> bool:
+        return self.hand[side] == 0 and self.pieces[side].bit_count() == 3
+
+    def forms_mill(self, point: int, side: int | None = None) -> bool:
+        """checks if the piece on point is part of a mill"""
+        if side is None:
+            side = self.owner(point)
+            if side is None:
+                return False
+        own = self.pieces[side]
+        m1, m2 = POINT_MILLS[point]
+        return own & m1 == m1 or own & m2 == m2
+
+    def mill_points(self, side: int) -> int:
+        """mask of all pieces of side that are part of a mill"""
+        own = self.pieces[side]
+        res = 0
+        for mill in MILLS:
+            if own & mill == mill:
+                res |= mill
+        return res
+
+    def removable(self, side: int) -> int:
+        """
+        mask of pieces of side that can be removed after a mill,
+        it's empty if all of them are in mills (then nothing is removed)
+        """
+        return self.pieces[side] & ~self.mill_points(side)
+
+    def destinations(self, point: int) -> int:
+        """mask of empty points the piece on point can move to"""
+        side = self.owner(point)
+        if side is None:
+            return 0
+        if self.is_flying(side):
+            return self.empty()
+        return NEIGHBOURS[point] & self.empty()
+
+    def moves(self) -> List[MOVE]:
+        side = self.turn
+        own = self.pieces[side]
+        empty = self.empty()
+        removable = self.removable(1 - side)
+        res: List[MOVE] = []
+        if self.hand[side]:
+            for dest in iter_points(empty):
+                _add_move(res, None, dest, own | 1 << dest, removable)
+            return res
+
+        flying = own.bit_count() == 3
+        for src in iter_points(own):
+            rest = own ^ 1 << src
+            for dest in iter_points(empty if flying else NEIGHBOURS[src] & empty):
+                _add_move(res, src, dest, rest | 1 << dest, removable)
+        return res
+
+    def play(self, move: MOVE) -> None:
+        src, dest, rmv = move
+        side = self.turn
+        keys = ZOBRIST_PIECES[side]
+        h = self.hash ^ ZOBRIST_TURN ^ keys[dest]
+        if src is None:
+            hand = ZOBRIST_HAND[side]
+            h ^= hand[self.hand[side]] ^ hand[self.hand[side] - 1]
+            self.hand[side] -= 1
+        else:
+            self.pieces[side] ^= 1 << src
+            h ^= keys[src]
+        self.pieces[side] |= 1 << dest
+        if rmv is not None:
+            self.pieces[1 - side] ^= 1 << rmv
+            h ^= ZOBRIST_PIECES[1 - side][rmv]
+        self.turn = 1 - side
+        self.hash = h
+
+    def undo(self, move: MOVE) -> None:
+        src, dest, rmv = move
+        self.turn = side = 1 - self.turn
+        keys = ZOBRIST_PIECES[side]
+        h = self.hash ^ ZOBRIST_TURN ^ keys[dest]
+        if rmv is not None:
+            self.pieces[1 - side] |= 1 << rmv
+            h ^= ZOBRIST_PIECES[1 - side][rmv]
+        self.pieces[side] ^= 1 << dest
+        if src is None:
+            hand = ZOBRIST_HAND[side]
+            h ^= hand[self.hand[side]] ^ hand[self.hand[side] + 1]
+            self.hand[side] += 1
+        else:
+            self.pieces[side] |= 1 << src
+            h ^= keys[src]
+        self.hash = h
+
+    def is_lost(self) -> bool:
+        """the side to move has lost: less than 3 pieces or no legal move"""
+        side = self.turn
+        if self.hand[side]:
+            return False
+        own = self.pieces[side]
+        if own.bit_count() < 3:
+            return True
+        if own.bit_count() == 3:
+            return False
+        empty = self.empty()
+        for src in iter_points(own):
+            if NEIGHBOURS[src] & empty:
+                return False
+        return True
+
+
+def board_str(white: int, black: int) -> str:
+    """the board in box-drawing characters with w and b for the pieces"""
+    rows = [list(row) for row in _BOARD]
+    for i, (col, row) in enumerate(GRID):
+        if white >> i & 1:
+            rows[row][3 * col] = 'w'
+        elif black >> i & 1:
+            rows[row][3 * col] = 'b'
+    return ''.join(''.join(row) + '\n' for row in rows)
+
+
+def _add_move(res: List[MOVE], src: int | None, dest: int, own: int, removable: int) -> None:
+    m1, m2 = POINT_MILLS[dest]
+    if removable and (own & m1 == m1 or own & m2 == m2):
+        res.extend((src, dest, rmv) for rmv in iter_points(removable))
+    else:
+        res.append((src, dest, None))
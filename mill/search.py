@@ -0,0 +1,324 @@
+"""
+negamax alpha-beta search with iterative deepening
+
+Scores are from the view of the side to move. A move includes the removal after a mill, so every ply is one complete
+turn of a player in all phases (placing, moving and flying).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from mill.evaluation import WEIGHTS, evaluate
+from mill.position import MOVE, Position
+from mill.symmetry import canonical_masks
+from mill.tablebase import Tablebase
+from mill.topology import MILLS
+from mill.ttable import EXACT, LOWER, UPPER, TranspositionTable
+
+WIN = 1000000
+# scores beyond this bound are forced wins or losses
+WIN_BOUND = WIN - 1000
+MAX_PLY = 128
+# captures searched at the horizon
+QUIESCENCE_DEPTH = 4
+
+
+class SearchLimits(NamedTuple):
+    depth: int
+    time: Optional[float]  # seconds
+    # node budget, the search stops at it and doesn't start an iteration that can't finish within it
+    nodes: Optional[int] = None
+
+
+class SearchResult(NamedTuple):
+    move: Optional[MOVE]
+    score: int
+    depth: int
+    nodes: int
+    time: float
+
+
+# search budget of the levels in the ai dropdown, the low levels are limited by the depth and the others by the
+# nodes, so a level plays equally strong on every machine. The time is a hard limit of every move that bounds the
+# latency (see python -m mill calibrate), the time manager of mill/timecontrol.py gives critical positions more nodes.
+LEVELS: Dict[int, SearchLimits] = {
+    1: SearchLimits(1, 0.05),
+    2: SearchLimits(2, 0.1),
+    3: SearchLimits(3, 0.2),
+    4: SearchLimits(MAX_PLY, 0.3, 2_000),
+    5: SearchLimits(MAX_PLY, 0.5, 5_000),
+    6: SearchLimits(MAX_PLY, 0.8, 12_000),
+    7: SearchLimits(MAX_PLY, 1.2, 20_000),
+    8: SearchLimits(MAX_PLY, 2.0, 35_000),
+    9: SearchLimits(MAX_PLY, 4.0, 80_000),
+}
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Search:
+    def __init__(self, tt: TranspositionTable | None = None, exact_depth: bool = False,
+                 tablebase: Tablebase | None = None, weights: Tuple[int, ...] = WEIGHTS):
+        """
+        exact_depth: only use table entries searched to exactly the requested depth, so scores don't depend on
+            what was searched before (needed for reproducible parallel searches)
+        tablebase: endgame positions are looked up instead of searched
+        weights: weights of the static evaluation (see mill/evaluation.py)
+        """
+        self.tt = TranspositionTable() if tt is None else tt
+        self.exact_depth = exact_depth
+        self.tablebase = tablebase if tablebase is not None and tablebase.tables else None
+        self.weights = weights
+        self.nodes = 0
+        self.deadline: float | None = None
+        self.max_nodes: int | None = None
+        self.stop: threading.Event | None = None
+        # result of the last completed iteration, can be read while the search is running
+        self.best: SearchResult | None = None
+        # move ordering
+        self.history: Dict[Tuple[Optional[int], int], int] = {}
+        self.killers: List[List[Optional[MOVE]]] = [[None, None] for _ in range(MAX_PLY + QUIESCENCE_DEPTH + 1)]
+        # positions on the current path (moving phase only) to detect repetitions
+        self.path: Dict[int, int] = {}
+
+    def run(self, position: Position, limits: SearchLimits, stop: threading.Event | None = None) -> SearchResult:
+        """
+        stop: the search returns the best move found so far once the event is set
+        """
+        start = time.perf_counter()
+        self._prepare(limits.time, stop, nodes=limits.nodes)
+        self.best = None
+
+        pos = position.copy()
+        moves = self.root_moves(pos)
+        if not moves:
+            return SearchResult(None, -WIN, 0, 0, time.perf_counter() - start)
+        best_move, best_score, completed = moves[0], 0, 0
+        if len(moves) > 1:
+            try:
+                for depth in range(1, limits.depth + 1):
+                    best_score, best_move = self._root(pos, moves, depth)
+                    completed = depth
+                    self.tt.store(pos.hash, depth, EXACT, best_score, best_move)
+                    self.best = SearchResult(best_move, best_score, depth, self.nodes, time.perf_counter() - start)
+                    # search the best move first in the next iteration
+                    moves.remove(best_move)
+                    moves.insert(0, best_move)
+                    if abs(best_score) >= WIN_BOUND:
+                        break
+                    if self.deadline is not None and \
+                            time.perf_counter() - start > (self.deadline - start) / 2:
+                        # the next iteration won't finish in time
+                        break
+                    if self.max_nodes is not None and self.nodes > self.max_nodes / 2:
+                        break
+            except SearchTimeout:
+                pass
+        return SearchResult(best_move, best_score, completed, self.nodes, time.perf_counter() - start)
+
+    def root_moves(self, position: Position) -> List[MOVE]:
+        """
+        legal moves in the order of the first iteration
+        moves leading to symmetric positions have the same score, only one of them is searched
+        """
+        moves = []
+        seen = set()
+        for move in position.moves():
+            position.play(move)
+            key = canonical_masks(*position.pieces)[:2]
+            position.undo(move)
+            if key not in seen:
+                seen.add(key)
+                moves.append(move)
+        entry = self.tt.probe(position.hash)
+        return self._order(position, moves, 0, None if entry is None else entry[4])
+
+    def search_move(self, position: Position, move: MOVE, depth: int, alpha: int, beta: int,
+                    time_left: float | None = None, stop: threading.Event | None = None,
+                    new_search: bool = True) -> int | None:
+        """
+        score of a single root move searched to depth (the move included) with the window (alpha, beta)
+        returns None if the search was stopped
+        """
+        self._prepare(time_left, stop, new_search)
+        pos = position.copy()
+        pos.play(move)
+        try:
+            return -self._negamax(pos, depth - 1, -beta, -alpha, 1)
+        except SearchTimeout:
+            return None
+
+    def _prepare(self, time_left: float | None, stop: threading.Event | None, new_search: bool = True,
+                 nodes: int | None = None) -> None:
+        self.nodes = 0
+        self.deadline = None if time_left is None else time.perf_counter() + time_left
+        self.max_nodes = nodes
+        self.stop = stop
+        self.path.clear()
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        if new_search:
+            self.tt.new_search()
+
+    def _root(self, pos: Position, moves: List[MOVE], depth: int) -> Tuple[int, MOVE]:
+        alpha = -WIN - 1
+        best_move = moves[0]
+        for move in moves:
+            pos.play(move)
+            score = -self._negamax(pos, depth - 1, -WIN - 1, -alpha, 1)
+            pos.undo(move)
+            if score > alpha:
+                alpha = score
+                best_move = move
+        return alpha, best_move
+
+    def _negamax(self, pos: Position, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if not self.nodes & 255:
+            self._check_time()
+        if pos.is_lost():
+            return ply - WIN
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiescence(pos, alpha, beta, ply, QUIESCENCE_DEPTH)
+
+        key = pos.hash
+        moving = not pos.hand[0] and not pos.hand[1]
+        if moving and key in self.path:
+            # repetition
+            return 0
+        if moving and self.tablebase is not None:
+            res = self.tablebase.probe(pos)
+            if res is not None:
+                result, dtm = res
+                # result is 1, 0 or -1 for a win, draw or loss
+                return result * (WIN - ply - dtm)
+
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry[4]
+            if entry[1] == depth or (entry[1] > depth and not self.exact_depth):
+                score = _score_from_tt(entry[3], ply)
+                bound = entry[2]
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    return score
+
+        if moving:
+            self.path[key] = ply
+        alpha_orig = alpha
+        best = -WIN - 1
+        best_move = None
+        for move in self._order(pos, pos.moves(), ply, tt_move):
+            pos.play(move)
+            score = -self._negamax(pos, depth - 1, -beta, -alpha, ply + 1)
+            pos.undo(move)
+            if score > best:
+                best = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self._store_cutoff(move, ply, depth)
+                        break
+        if moving:
+            del self.path[key]
+
+        if best <= alpha_orig:
+            bound = UPPER
+        elif best >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.tt.store(key, depth, bound, _score_to_tt(best, ply), best_move)
+        return best
+
+    def _quiescence(self, pos: Position, alpha: int, beta: int, ply: int, depth: int) -> int:
+        """only searches moves that close a mill"""
+        best = evaluate(pos, self.weights)
+        if depth <= 0 or best >= beta:
+            return best
+        alpha = max(alpha, best)
+        for move in pos.moves():
+            if move[2] is None:
+                continue
+            self.nodes += 1
+            pos.play(move)
+            if pos.is_lost():
+                score = WIN - ply - 1
+            else:
+                score = -self._quiescence(pos, -beta, -alpha, ply + 1, depth - 1)
+            pos.undo(move)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
+
+    def _order(self, pos: Position, moves: List[MOVE], ply: int, tt_move: MOVE | None = None) -> List[MOVE]:
+        opp = pos.pieces[1 - pos.turn]
+        empty = pos.empty()
+        # points that would close a mill of the opponent and the pieces of these open mills
+        threats = threat_pieces = 0
+        for mill in MILLS:
+            if (opp & mill).bit_count() == 2 and empty & mill:
+                threats |= empty & mill
+                threat_pieces |= opp & mill
+        killers = self.killers[ply]
+        history = self.history
+
+        def key(move: MOVE) -> int:
+            src, dest, rmv = move
+            score = history.get((src, dest), 0)
+            if rmv is not None:
+                score += 1 << 30
+                if threat_pieces >> rmv & 1:
+                    score += 1 << 28
+            if threats >> dest & 1:
+                score += 1 << 29
+            if move == killers[0] or move == killers[1]:
+                score += 1 << 27
+            if move == tt_move:
+                score += 1 << 31
+            return score
+
+        return sorted(moves, key=key, reverse=True)
+
+    def _store_cutoff(self, move: MOVE, ply: int, depth: int) -> None:
+        if move[2] is None:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        key = move[0], move[1]
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def _check_time(self) -> None:
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if self.stop is not None and self.stop.is_set():
+            raise SearchTimeout()
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise SearchTimeout()
+
+
+def _score_to_tt(score: int, ply: int) -> int:
+    """stores win scores relative to the position instead of the root"""
+    if score >= WIN_BOUND:
+        return score + ply
+    if score <= -WIN_BOUND:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: int, ply: int) -> int:
+    if score >= WIN_BOUND:
+        return score - ply
+    if score <= -WIN_BOUND:
+        return score + ply
+    return score
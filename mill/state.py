@@ -0,0 +1,137 @@
+"""
+rules of a whole game without any dependency on pygame
+
+GameState adds what a front-end needs to the bitboard Position (see mill/position.py): the phase of the game, the
+winner, the moves played so far with undo and the input of a turn in two steps, the move and then the piece to remove
+after a mill. The ui only maps the state to its sprites, the ai and the tools use the same rules.
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+from mill.position import MOVE, Position
+from mill.topology import NEIGHBOURS, POINT_MILLS, POINTS
+
+# phases
+PLACING = 0
+MOVING = 1
+# a mill is closed, the piece to remove is missing
+REMOVING = 2
+OVER = 3
+
+
+class IllegalMove(Exception):
+    pass
+
+
+class GameState:
+    __slots__ = ('position', 'history', 'pending')
+
+    def __init__(self, position: Position | None = None):
+        self.position = position if position is not None else Position()
+        self.history: List[MOVE] = []
+        # (src, dest) of a move that waits for the piece to remove (see begin)
+        self.pending: Optional[Tuple[Optional[int], int]] = None
+
+    def copy(self) -> GameState:
+        res = GameState(self.position.copy())
+        res.history = self.history.copy()
+        res.pending = self.pending
+        return res
+
+    @property
+    def turn(self) -> int:
+        """side to move, while removing still the side that closed the mill"""
+        return self.position.turn
+
+    def phase(self) -> int:
+        if self.pending is not None:
+            return REMOVING
+        if self.position.is_lost():
+            return OVER
+        return PLACING if self.position.is_placing() else MOVING
+
+    def winner(self) -> int | None:
+        return 1 - self.position.turn if self.phase() == OVER else None
+
+    def is_flying(self, side: int | None = None) -> bool:
+        return self.position.is_flying(self.position.turn if side is None else side)
+
+    def moves(self) -> List[MOVE]:
+        """legal moves, none while removing or after the game is over"""
+        if self.pending is not None or self.position.is_lost():
+            return []
+        return self.position.moves()
+
+    def is_legal(self, move: MOVE) -> bool:
+        """checks a move without generating all moves"""
+        if self.pending is not None or self.position.is_lost():
+            return False
+        src, dest, rmv = move
+        pos = self.position
+        side = pos.turn
+        own = pos.pieces[side]
+        if not (0 <= dest < len(POINTS) and pos.empty() >> dest & 1):
+            return False
+        if pos.hand[side]:
+            if src is not None:
+                return False
+            own |= 1 << dest
+        else:
+            if src is None or not (0 <= src < len(POINTS) and own >> src & 1):
+                return False
+            if not pos.is_flying(side) and not NEIGHBOURS[src] >> dest & 1:
+                return False
+            own ^= 1 << src | 1 << dest
+        removable = pos.removable(1 - side)
+        m1, m2 = POINT_MILLS[dest]
+        if removable and (own & m1 == m1 or own & m2 == m2):
+            return rmv is not None and 0 <= rmv < len(POINTS) and bool(removable >> rmv & 1)
+        return rmv is None
+
+    def apply(self, move: MOVE) -> None:
+        if not self.is_legal(move):
+            raise IllegalMove(f'{move} is not a legal move.')
+        self.position.play(move)
+        self.history.append(move)
+
+    def undo(self) -> MOVE | None:
+        """takes back the pending step or else the last move, returns the move taken back"""
+        if self.pending is not None:
+            self.pending = None
+            return None
+        if not self.history:
+            raise IllegalMove('There is no move to undo.')
+        move = self.history.pop()
+        self.position.undo(move)
+        return move
+
+    def begin(self, src: int | None, dest: int) -> bool:
+        """
+        first step of a turn: places (src is None) or moves a piece
+        returns True if the piece closes a mill, then the move is pending until finish gets the piece to remove
+        """
+        if self.is_legal((src, dest, None)):
+            self.apply((src, dest, None))
+            return False
+        removable = self.position.removable(1 - self.position.turn)
+        if not removable or not self.is_legal((src, dest, (removable & -removable).bit_length() - 1)):
+            raise IllegalMove("You can't move there.")
+        self.pending = src, dest
+        return True
+
+    def removable(self) -> int:
+        """mask of the pieces the pending move may remove"""
+        if self.pending is None:
+            return 0
+        return self.position.removable(1 - self.position.turn)
+
+    def finish(self, rmv: int) -> None:
+        """second step of a turn: removes a piece after a mill"""
+        if self.pending is None:
+            raise IllegalMove('There is no piece to remove.')
+        if not self.removable() >> rmv & 1:
+            raise IllegalMove("You can't remove this piece.")
+        src, dest = self.pending
+        self.pending = None
+        self.apply((src, dest, rmv))
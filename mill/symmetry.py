@@ -0,0 +1,104 @@
+"""
+symmetries of the board
+
+The board has 16 symmetries: the 8 rotations and reflections of the square combined with swapping the inner and the
+outer ring. Symmetry t maps point i to PERMUTATIONS[t][i]. Masks are mapped with one table lookup per byte, so
+canonicalizing a position (the smallest image under all symmetries) is cheap enough to be done per node.
+"""
+from __future__ import annotations
+
+from typing import Callable, List, Tuple
+
+from mill.position import MOVE, Position
+from mill.topology import COORDINATES, POINT_INDEX, POINTS
+
+# (x, y) -> (x, y) of the rotations and reflections of the square
+_SQUARE: Tuple[Callable[[int, int], Tuple[int, int]], ...] = (
+    lambda x, y: (x, y),
+    lambda x, y: (2 - y, x),
+    lambda x, y: (2 - x, 2 - y),
+    lambda x, y: (y, 2 - x),
+    lambda x, y: (2 - x, y),
+    lambda x, y: (x, 2 - y),
+    lambda x, y: (y, x),
+    lambda x, y: (2 - y, 2 - x),
+)
+
+
+def _image(coords: COORDINATES, t: int) -> COORDINATES:
+    r, x, y = coords
+    if t >= len(_SQUARE):
+        # swap inner and outer ring
+        r = 2 - r
+    return (r, *_SQUARE[t % len(_SQUARE)](x, y))
+
+
+SYMMETRIES = 2 * len(_SQUARE)
+# symmetry 0 is the identity
+PERMUTATIONS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(POINT_INDEX[_image(coords, t)] for coords in POINTS) for t in range(SYMMETRIES)
+)
+INVERSE: Tuple[int, ...] = tuple(
+    next(u for u in range(SYMMETRIES) if all(PERMUTATIONS[u][PERMUTATIONS[t][i]] == i for i in range(len(POINTS))))
+    for t in range(SYMMETRIES)
+)
+
+
+def _byte_tables(permutation: Tuple[int, ...]) -> Tuple[List[int], ...]:
+    tables = []
+    for shift in range(0, len(POINTS), 8):
+        table = [0] * 256
+        for byte in range(1, 256):
+            # the image of the byte without its lowest bit is already known
+            low = byte & -byte
+            table[byte] = table[byte ^ low] | 1 << permutation[shift + low.bit_length() - 1]
+        tables.append(table)
+    return tuple(tables)
+
+
+_BYTE_TABLES = tuple(_byte_tables(permutation) for permutation in PERMUTATIONS)
+
+
+def transform_mask(mask: int, t: int) -> int:
+    low, mid, high = _BYTE_TABLES[t]
+    return low[mask & 255] | mid[mask >> 8 & 255] | high[mask >> 16]
+
+
+def transform_move(move: MOVE, t: int) -> MOVE:
+    permutation = PERMUTATIONS[t]
+    src, dest, rmv = move
+    return (
+        None if src is None else permutation[src],
+        permutation[dest],
+        None if rmv is None else permutation[rmv],
+    )
+
+
+def transform(position: Position, t: int) -> Position:
+    white, black = position.pieces
+    return Position(transform_mask(white, t), transform_mask(black, t), position.turn, position.hand)
+
+
+def canonical_masks(first: int, second: int) -> Tuple[int, int, int]:
+    """(first, second, t) of the image with the smallest (first, second) under all symmetries"""
+    best_first, best_second, best = first, second, 0
+    for t in range(1, SYMMETRIES):
+        low, mid, high = _BYTE_TABLES[t]
+        image = low[first & 255] | mid[first >> 8 & 255] | high[first >> 16]
+        if image > best_first:
+            continue
+        image_second = low[second & 255] | mid[second >> 8 & 255] | high[second >> 16]
+        if image < best_first or image_second < best_second:
+            best_first, best_second, best = image, image_second, t
+    return best_first, best_second, best
+
+
+def canonical(position: Position) -> Tuple[Position, int]:
+    """
+    the representative of all symmetric positions (position itself if t is 0) and the symmetry t that maps position
+    to it, moves of the representative are mapped back with transform_move(move, INVERSE[t])
+    """
+    white, black, t = canonical_masks(*position.pieces)
+    if not t:
+        return position, 0
+    return Position(white, black, position.turn, position.hand), t
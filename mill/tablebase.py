@@ -0,0 +1,438 @@
+"""
+retrograde endgame tablebases for the moving and flying phases
+
+A table holds all positions with a pieces of the side to move, b pieces of the opponent and no pieces in hand.
+A position is indexed by the colex rank of the pieces of the side to move and the colex rank of the opponents pieces
+among the remaining points. Every position is stored in one byte: 0 is a draw, otherwise the value is the distance to
+the end in plies + 1. Even distances are losses of the side to move, odd distances are wins.
+Symmetric positions have the same value, so the files only store the positions whose pieces of the side to move are
+the smallest of their 16 symmetric images (see mill/symmetry.py), that is about 1/16 of all positions.
+
+file format: header (magic, version, a, b, number of stored positions) followed by one byte per stored position
+
+generate tables with
+    python -m mill.tablebase 3v3 4v3 --dir tablebases
+"""
+from __future__ import annotations
+
+import argparse
+import mmap
+import os
+import struct
+import time
+from array import array
+from math import comb
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from mill.evaluation import evaluate
+from mill.position import MOVE, Position, iter_points
+from mill.symmetry import SYMMETRIES, canonical_masks, transform_mask
+from mill.topology import ALL_POINTS, MILLS, NEIGHBOURS, POINT_MILLS, POINTS
+
+TABLEBASE_DIR = 'tablebases'
+
+# results for the side to move
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+_MAGIC = b'MILLTB'
+_VERSION = 2
+_HEADER = struct.Struct('<6sBBBI')
+_BINOMIAL = [[comb(n, k) for k in range(len(POINTS) + 1)] for n in range(len(POINTS) + 1)]
+
+
+def _rank(mask: int) -> int:
+    """colex rank of a set of points"""
+    res = 0
+    k = 1
+    while mask:
+        low = mask & -mask
+        res += _BINOMIAL[low.bit_length() - 1][k]
+        k += 1
+        mask ^= low
+    return res
+
+
+def _rank_among(mask: int, occupied: int) -> int:
+    """colex rank of a set of points, that ignores the points in occupied"""
+    res = 0
+    k = 1
+    while mask:
+        low = mask & -mask
+        res += _BINOMIAL[low.bit_length() - 1 - (occupied & (low - 1)).bit_count()][k]
+        k += 1
+        mask ^= low
+    return res
+
+
+def _subsets(n: int, k: int) -> List[int]:
+    """all k-subsets of n points in colex order"""
+    res = []
+    mask = (1 << k) - 1
+    while mask < 1 << n:
+        res.append(mask)
+        # next bit permutation
+        low = mask & -mask
+        ripple = mask + low
+        mask = (((ripple ^ mask) >> 2) // low) | ripple
+    return res
+
+
+def _expand(compressed: int, free: Sequence[int]) -> int:
+    res = 0
+    for i in iter_points(compressed):
+        res |= 1 << free[i]
+    return res
+
+
+def _free_points(occupied: int) -> List[int]:
+    return [p for p in range(len(POINTS)) if not occupied >> p & 1]
+
+
+def _mill_points(mask: int) -> int:
+    res = 0
+    for mill in MILLS:
+        if mask & mill == mill:
+            res |= mill
+    return res
+
+
+def _forms_mill(mask: int, point: int) -> bool:
+    m1, m2 = POINT_MILLS[point]
+    return mask & m1 == m1 or mask & m2 == m2
+
+
+class Layout:
+    """indexing of the positions with a pieces of the side to move and b pieces of the opponent"""
+
+    def __init__(self, a: int, b: int):
+        self.a = a
+        self.b = b
+        self.stride = comb(len(POINTS) - a, b)
+        self.size = comb(len(POINTS), a) * self.stride
+        self._stm_masks: List[int] | None = None
+        self._opp_masks: List[int] | None = None
+        # pieces of the side to move that are the smallest of their symmetric images and their number in the file
+        self.classes = [stm for stm in _subsets(len(POINTS), a) if _is_canonical(stm)]
+        self.class_index = {stm: i for i, stm in enumerate(self.classes)}
+        self.stored_size = len(self.classes) * self.stride
+
+    def index(self, stm: int, opp: int) -> int:
+        return _rank(stm) * self.stride + _rank_among(opp, stm)
+
+    def stored_index(self, stm: int, opp: int) -> int:
+        """index of the symmetric position stored in the file"""
+        stm, opp, _ = canonical_masks(stm, opp)
+        return self.class_index[stm] * self.stride + _rank_among(opp, stm)
+
+    def masks(self, index: int) -> Tuple[int, int]:
+        """pieces of the side to move and the opponent"""
+        stm_masks, opp_masks = self._subsets()
+        stm = stm_masks[index // self.stride]
+        return stm, _expand(opp_masks[index % self.stride], _free_points(stm))
+
+    def positions(self) -> Iterator[Tuple[int, int, int]]:
+        """(index, stm, opp) of all positions in index order"""
+        stm_masks, opp_masks = self._subsets()
+        index = 0
+        for stm in stm_masks:
+            free = _free_points(stm)
+            for compressed in opp_masks:
+                yield index, stm, _expand(compressed, free)
+                index += 1
+
+    def _subsets(self) -> Tuple[List[int], List[int]]:
+        if self._stm_masks is None:
+            self._stm_masks = _subsets(len(POINTS), self.a)
+            self._opp_masks = _subsets(len(POINTS) - self.a, self.b)
+        return self._stm_masks, self._opp_masks
+
+
+def _is_canonical(mask: int) -> bool:
+    return all(transform_mask(mask, t) >= mask for t in range(1, SYMMETRIES))
+
+
+def _decode(value: int) -> Tuple[int, int]:
+    if not value:
+        return DRAW, 0
+    dtm = value - 1
+    return (LOSS if dtm % 2 == 0 else WIN), dtm
+
+
+class Tablebase:
+    """memory mapped tables of a directory, missing tables are just not probed"""
+
+    def __init__(self, directory: str = TABLEBASE_DIR):
+        self.directory = directory
+        self.tables: Dict[Tuple[int, int], Tuple[Layout, mmap.mmap]] = {}
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if name.startswith('mill_') and name.endswith('.tb'):
+                    self._open(os.path.join(directory, name))
+
+    def _open(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, a, b, size = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f'{path} is no tablebase of version {_VERSION}')
+        layout = Layout(a, b)
+        if size != layout.stored_size or len(data) != _HEADER.size + size:
+            raise ValueError(f'{path} is corrupt')
+        self.tables[a, b] = layout, data
+
+    def close(self) -> None:
+        for _, data in self.tables.values():
+            data.close()
+        self.tables.clear()
+
+    def __contains__(self, position: Position) -> bool:
+        side = position.turn
+        return not position.hand[0] and not position.hand[1] and \
+            (position.pieces[side].bit_count(), position.pieces[1 - side].bit_count()) in self.tables
+
+    def probe_masks(self, stm: int, opp: int) -> Tuple[int, int] | None:
+        """(result, distance to the end in plies) for the side to move or None if there is no table"""
+        table = self.tables.get((stm.bit_count(), opp.bit_count()))
+        if table is None:
+            return None
+        layout, data = table
+        return _decode(data[_HEADER.size + layout.stored_index(stm, opp)])
+
+    def probe(self, position: Position) -> Tuple[int, int] | None:
+        if position.hand[0] or position.hand[1]:
+            return None
+        side = position.turn
+        return self.probe_masks(position.pieces[side], position.pieces[1 - side])
+
+    def best_move(self, position: Position) -> MOVE | None:
+        """
+        the fastest win, the slowest loss or a move that keeps the draw
+        returns None if the position or one of its successors isn't in the tables
+        """
+        if self.probe(position) is None:
+            return None
+        best: Tuple[int, int, int] | None = None
+        best_move = None
+        for move in position.moves():
+            position.play(move)
+            if position.pieces[position.turn].bit_count() < 3:
+                # opponent lost
+                rating = WIN, 0, 0
+            else:
+                res = self.probe(position)
+                if res is None:
+                    position.undo(move)
+                    return None
+                result, dtm = res
+                # prefer fast wins, slow losses and good evaluated draws
+                rating = -result, -dtm if result == LOSS else dtm, -evaluate(position) if result == DRAW else 0
+            position.undo(move)
+            if best is None or rating > best:
+                best, best_move = rating, move
+        return best_move
+
+
+class _Table:
+    """a table while it is generated"""
+
+    def __init__(self, a: int, b: int):
+        self.layout = Layout(a, b)
+        self.values = bytearray(self.layout.size)
+        # number of moves that don't lead to a won position for the opponent (yet)
+        self.counts = array('H', bytes(2 * self.layout.size))
+
+    def save(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, table_name(self.layout.a, self.layout.b))
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.layout.a, self.layout.b, self.layout.stored_size))
+            stride = self.layout.stride
+            for stm in self.layout.classes:
+                i = _rank(stm) * stride
+                f.write(self.values[i:i + stride])
+        return path
+
+
+def table_name(a: int, b: int) -> str:
+    return f'mill_{a}_{b}.tb'
+
+
+class Generator:
+    """
+    Generates the tables of a piece count class together with the one of the opponent (a v b and b v a),
+    the tables reached after a capture have to be available in the tablebase.
+    """
+
+    def __init__(self, tablebase: Tablebase, verbose: bool = False):
+        self.tablebase = tablebase
+        self.verbose = verbose
+
+    def generate(self, a: int, b: int) -> List[str]:
+        start = time.perf_counter()
+        pair = [(a, b)] if a == b else [(a, b), (b, a)]
+        tables = [_Table(*counts) for counts in pair]
+        # positions with a known distance to the end and positions whose capture moves reach such positions
+        frontiers: Dict[int, List[int]] = {}
+        win_events: Dict[int, List[int]] = {}
+        loss_events: Dict[int, List[int]] = {}
+        for tid, table in enumerate(tables):
+            self._init(tid, table, frontiers, win_events, loss_events)
+        self._log(f'{a}v{b}: initialized {sum(t.layout.size for t in tables)} positions', start)
+
+        level = 0
+        while frontiers or win_events or loss_events:
+            nxt = frontiers.setdefault(level + 1, [])
+            for code in win_events.pop(level, ()):
+                table = tables[code & 1]
+                i = code >> 1
+                if not table.values[i]:
+                    table.values[i] = _value(level + 1)
+                    nxt.append(code)
+            for code in loss_events.pop(level, ()):
+                table = tables[code & 1]
+                i = code >> 1
+                if not table.values[i]:
+                    table.counts[i] -= 1
+                    if not table.counts[i]:
+                        table.values[i] = _value(level + 1)
+                        nxt.append(code)
+            for code in frontiers.pop(level, ()):
+                self._retract(tables, code, level, nxt)
+            if not nxt:
+                del frontiers[level + 1]
+            level += 1
+        self._log(f'{a}v{b}: solved, longest distance {level - 1}', start)
+
+        paths = [table.save(self.tablebase.directory) for table in tables]
+        for path in paths:
+            self.tablebase._open(path)
+        return paths
+
+    def _init(self, tid: int, table: _Table, frontiers: Dict[int, List[int]], win_events: Dict[int, List[int]],
+              loss_events: Dict[int, List[int]]) -> None:
+        a, b = table.layout.a, table.layout.b
+        values, counts = table.values, table.counts
+        flying = a == 3
+        # table after a capture, None if the opponent then has lost
+        sub = None
+        if b > 3:
+            sub = self.tablebase.tables.get((b - 1, a))
+            if sub is None:
+                raise ValueError(f'table {b - 1}v{a} is needed for {a}v{b}')
+        for i, stm, opp in table.layout.positions():
+            empty = ALL_POINTS & ~(stm | opp)
+            removable = opp & ~_mill_points(opp)
+            n_removable = removable.bit_count()
+            count = 0
+            won = False
+            for src in iter_points(stm):
+                rest = stm ^ 1 << src
+                targets = empty if flying else NEIGHBOURS[src] & empty
+                if not targets:
+                    continue
+                count += targets.bit_count()
+                if not n_removable:
+                    continue
+                # destinations that close a mill
+                closing = 0
+                for p in iter_points(rest):
+                    for mill in POINT_MILLS[p]:
+                        if (rest & mill).bit_count() == 2:
+                            closing |= mill & targets
+                if not closing:
+                    continue
+                if sub is None:
+                    won = True
+                    break
+                count += closing.bit_count() * (n_removable - 1)
+                layout, data = sub
+                for dest in iter_points(closing):
+                    new_stm = rest | 1 << dest
+                    for rmv in iter_points(removable):
+                        value = data[_HEADER.size + layout.stored_index(opp ^ 1 << rmv, new_stm)]
+                        if value:
+                            dtm = value - 1
+                            events = win_events if dtm % 2 == 0 else loss_events
+                            events.setdefault(dtm, []).append(i << 1 | tid)
+
+            if won:
+                values[i] = _value(1)
+                frontiers.setdefault(1, []).append(i << 1 | tid)
+            elif not count:
+                values[i] = _value(0)
+                frontiers.setdefault(0, []).append(i << 1 | tid)
+            else:
+                counts[i] = count
+
+    @staticmethod
+    def _retract(tables: List[_Table], code: int, level: int, nxt: List[int]) -> None:
+        """updates all positions with a move (without capture) to the position of code"""
+        table = tables[code & 1]
+        stm, mover = table.layout.masks(code >> 1)
+        pid = 0 if len(tables) == 1 else 1 - (code & 1)
+        prev = tables[pid]
+        layout, values, counts = prev.layout, prev.values, prev.counts
+        loss = level % 2 == 0
+        value = _value(level + 1)
+        empty = ALL_POINTS & ~(stm | mover)
+        flying = mover.bit_count() == 3
+        # closing a mill without capture is only legal if all pieces of the opponent are in mills
+        mill_allowed = not stm & ~_mill_points(stm)
+        for dest in iter_points(mover):
+            rest = mover ^ 1 << dest
+            if not mill_allowed and _forms_mill(mover, dest):
+                continue
+            for src in iter_points(empty if flying else NEIGHBOURS[dest] & empty):
+                i = layout.index(rest | 1 << src, stm)
+                if values[i]:
+                    continue
+                if not loss:
+                    counts[i] -= 1
+                    if counts[i]:
+                        continue
+                values[i] = value
+                nxt.append(i << 1 | pid)
+
+    def _log(self, message: str, start: float) -> None:
+        if self.verbose:
+            print(f'[{time.perf_counter() - start:8.1f}s] {message}')
+
+
+def _value(dtm: int) -> int:
+    if dtm >= 255:
+        raise OverflowError('distance to the end does not fit in a byte')
+    return dtm + 1
+
+
+def required_classes(a: int, b: int) -> List[Tuple[int, int]]:
+    """all classes needed for a v b (a >= b), smallest first"""
+    res = set()
+    for x in range(3, max(a, b) + 1):
+        for y in range(3, x + 1):
+            if x <= max(a, b) and y <= min(a, b):
+                res.add((x, y))
+    return sorted(res, key=lambda c: (c[0] + c[1], c))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='generate endgame tablebases of the mill game')
+    parser.add_argument('classes', nargs='+', help='piece count classes like 3v3 or 4v3')
+    parser.add_argument('--dir', default=TABLEBASE_DIR, help=f'output directory (default: {TABLEBASE_DIR})')
+    args = parser.parse_args(argv)
+
+    tablebase = Tablebase(args.dir)
+    generator = Generator(tablebase, verbose=True)
+    for spec in args.classes:
+        a, b = sorted(map(int, spec.lower().split('v')), reverse=True)
+        if b < 3:
+            parser.error(f'{spec}: both sides need at least 3 pieces')
+        for x, y in required_classes(a, b):
+            if (x, y) not in tablebase.tables or (y, x) not in tablebase.tables:
+                for path in generator.generate(x, y):
+                    print(f'wrote {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+time budgets of the ai moves and chess clocks
+
+A level (see LEVELS in mill/search.py) has a node budget for a move and a time limit that bounds the latency of every
+move. The time manager gives critical positions, where a mill can be closed by one of the players, CRITICAL_FACTOR
+times the nodes of the level. With a chess clock a move gets a share of the remaining time plus the increment, critical
+positions again CRITICAL_FACTOR times more, and never more than the time limit of the level.
+
+A time control is written like in chess, 5+3 gives both players 5 minutes and adds 3 seconds after every move.
+"""
+from __future__ import annotations
+
+import time
+from typing import List, NamedTuple
+
+from mill.position import Position
+from mill.search import SearchLimits
+from mill.topology import MILLS, NEIGHBOURS
+
+CRITICAL_FACTOR = 2
+# moves a player is expected to make until the end of the game
+MOVES_TO_GO = 25
+# share of the remaining time a single move may use at most
+MAX_SHARE = 0.2
+# seconds kept back for everything around the search
+SAFETY_MARGIN = 0.05
+MIN_TIME = 0.01
+
+
+def can_close_mill(position: Position, side: int) -> bool:
+    """side has two pieces of a mill and a piece that can reach the empty third point"""
+    own = position.pieces[side]
+    empty = position.empty()
+    anywhere = position.hand[side] > 0 or position.is_flying(side)
+    for mill in MILLS:
+        if (own & mill).bit_count() != 2 or not empty & mill:
+            continue
+        point = (empty & mill).bit_length() - 1
+        if anywhere or NEIGHBOURS[point] & own & ~mill:
+            return True
+    return False
+
+
+def is_critical(position: Position) -> bool:
+    """a mill is threatened, the side to move can close it or has to block it"""
+    return can_close_mill(position, position.turn) or can_close_mill(position, 1 - position.turn)
+
+
+def move_limits(position: Position, limits: SearchLimits, time_left: float | None = None,
+                increment: float = 0.0) -> SearchLimits:
+    """
+    limits of a move in position for a level with limits
+    time_left: time on the clock of the side to move, None plays without a clock
+    increment: seconds added to the clock after the move
+    """
+    factor = CRITICAL_FACTOR if is_critical(position) else 1
+    nodes = None if limits.nodes is None else limits.nodes * factor
+    seconds = limits.time
+    if time_left is not None:
+        share = min((time_left / MOVES_TO_GO + increment) * factor, time_left * MAX_SHARE)
+        share = max(share - SAFETY_MARGIN, MIN_TIME)
+        seconds = share if seconds is None else min(seconds, share)
+    return SearchLimits(limits.depth, seconds, nodes)
+
+
+class TimeControl(NamedTuple):
+    base: float  # seconds of each player
+    increment: float = 0.0  # seconds added after every move
+
+    @classmethod
+    def parse(cls, text: str) -> TimeControl:
+        """minutes+seconds like 5+3, the increment is optional"""
+        minutes, _, seconds = text.partition('+')
+        try:
+            control = cls(float(minutes) * 60, float(seconds) if seconds else 0.0)
+        except ValueError:
+            raise ValueError(f'{text!r} is no time control, expected minutes+seconds like 5+3') from None
+        if control.base <= 0 or control.increment < 0:
+            raise ValueError(f'{text!r} is no time control, expected minutes+seconds like 5+3')
+        return control
+
+    def __str__(self) -> str:
+        return f'{self.base / 60:g}+{self.increment:g}'
+
+
+class Clock:
+    """chess clock of both players, the time of the player to move runs"""
+
+    def __init__(self, control: TimeControl):
+        self.control = control
+        self.remaining: List[float] = [control.base, control.base]
+        # side whose time runs
+        self.running: int | None = None
+        self._started = 0.0
+
+    def start(self, side: int) -> None:
+        """stops the time of the other player and starts the time of side"""
+        if self.running == side:
+            return
+        self.stop()
+        self.running = side
+        self._started = time.perf_counter()
+
+    def stop(self, increment: bool = True) -> None:
+        """stops the running time, the increment is added if the player still has time (not at the end of a game)"""
+        if self.running is None:
+            return
+        side = self.running
+        self.remaining[side] -= time.perf_counter() - self._started
+        if increment and self.remaining[side] > 0:
+            self.remaining[side] += self.control.increment
+        self.running = None
+
+    def time_left(self, side: int) -> float:
+        res = self.remaining[side]
+        if self.running == side:
+            res -= time.perf_counter() - self._started
+        return res
+
+    def flagged(self, side: int) -> bool:
+        """the time of side is up"""
+        return self.time_left(side) <= 0
+
+
+def format_time(seconds: float) -> str:
+    """m:ss, tenths below 10 seconds"""
+    # rounded first, 9.96 seconds are shown as 0:10
+    seconds = round(max(seconds, 0.0), 1)
+    if seconds < 10:
+        return f'0:0{seconds:.1f}'
+    return f'{int(seconds) // 60}:{int(seconds) % 60:02d}'
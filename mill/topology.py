@@ -0,0 +1,59 @@
+"""
+topology of the board: all tables of the rules are built from the 16 lines of the board
+
+The 24 points are numbered 0..23 ring by ring and inside a ring in the (x, y) order of the 3d board lists in game.py.
+Every line of three points is a mill and neighbouring points of a line are adjacent, so the adjacency and the mills
+can't disagree. The tables are flat tuples indexed by point, sets of points are masks with bit i set for point i.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+# Type alias
+COORDINATES = Tuple[int, int, int]
+
+POINTS: Tuple[COORDINATES, ...] = tuple(
+    (r, x, y) for r in range(3) for x in range(3) for y in range(3) if not x == y == 1
+)
+POINT_INDEX: Dict[COORDINATES, int] = {coords: i for i, coords in enumerate(POINTS)}
+ALL_POINTS = (1 << len(POINTS)) - 1
+
+
+def _lines() -> List[Tuple[COORDINATES, COORDINATES, COORDINATES]]:
+    res = []
+    for r in range(3):
+        # vertical on ring
+        res.extend(((r, x, 0), (r, x, 1), (r, x, 2)) for x in (0, 2))
+        # horizontal on ring
+        res.extend(((r, 0, y), (r, 1, y), (r, 2, y)) for y in (0, 2))
+    # between rings
+    res.extend(((0, x, y), (1, x, y), (2, x, y)) for x, y in ((1, 0), (1, 2), (0, 1), (2, 1)))
+    return res
+
+
+# the points of every line in order
+LINES: Tuple[Tuple[int, int, int], ...] = tuple(
+    tuple(POINT_INDEX[coords] for coords in line) for line in _lines()
+)
+MILLS: Tuple[int, ...] = tuple(1 << a | 1 << b | 1 << c for a, b, c in LINES)
+# the two mills through every point
+POINT_MILLS: Tuple[Tuple[int, int], ...] = tuple(
+    tuple(mill for mill in MILLS if mill >> i & 1) for i in range(len(POINTS))
+)
+
+
+def _neighbour_points(point: int) -> Tuple[int, ...]:
+    res = set()
+    for line in LINES:
+        if point in line:
+            j = line.index(point)
+            res.update(line[k] for k in (j - 1, j + 1) if 0 <= k < 3)
+    return tuple(sorted(res))
+
+
+NEIGHBOUR_POINTS: Tuple[Tuple[int, ...], ...] = tuple(_neighbour_points(i) for i in range(len(POINTS)))
+NEIGHBOURS: Tuple[int, ...] = tuple(sum(1 << n for n in neighbours) for neighbours in NEIGHBOUR_POINTS)
+
+# column and row of every point on the 7x7 grid of the drawn board
+GRID: Tuple[Tuple[int, int], ...] = tuple((r + x * (3 - r), r + y * (3 - r)) for r, x, y in POINTS)
+
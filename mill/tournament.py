@@ -0,0 +1,250 @@
+"""
+headless ai vs ai tournaments
+
+Two engines play pairs of games from the same random opening, once with each color. The games run in parallel on a
+process pool. The report has the results of the first engine, the elo difference with its 95% confidence interval,
+the move latency of both engines and the throughput.
+
+An engine is given as LEVEL[:option=value,...] with the options tt (megabytes of the transposition table),
+book (opening book file), tb (tablebase directory), weights (weights file of the evaluation) and backend (alphabeta or
+mcts), 'none' disables the book, the tablebase or the weights file:
+    python -m mill.tournament 5 3 --games 200
+    python -m mill.tournament 4 4:book=none,tb=none --games 100 --workers 4
+    python -m mill.tournament 4 4:weights=none --games 200
+    python -m mill.tournament 4:backend=mcts 4 --games 100
+    python -m mill.tournament 7 5 --games 20 --clock 0.5+0.1
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from mill.book import BOOK_FILE
+from mill.engine import ALPHA_BETA, MCTS_BACKEND, Engine
+from mill.evaluation import WEIGHTS_FILE
+from mill.position import BLACK, WHITE, Position
+from mill.tablebase import TABLEBASE_DIR
+from mill.timecontrol import Clock, TimeControl
+
+# games without a winner after this many plies are draws
+MAX_PLIES = 300
+# a position of the moving phase reached this often is a draw
+REPETITIONS = 3
+
+
+class EngineSpec(NamedTuple):
+    name: str
+    level: int
+    tt_megabytes: float = 32
+    book_file: Optional[str] = BOOK_FILE
+    tablebase_dir: Optional[str] = TABLEBASE_DIR
+    weights_file: Optional[str] = WEIGHTS_FILE
+    backend: str = ALPHA_BETA
+
+
+def parse_engine(text: str) -> EngineSpec:
+    level, _, options = text.partition(':')
+    spec = EngineSpec(text, int(level))
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        if key == 'tt':
+            spec = spec._replace(tt_megabytes=float(value))
+        elif key == 'book':
+            spec = spec._replace(book_file=None if value == 'none' else value)
+        elif key == 'tb':
+            spec = spec._replace(tablebase_dir=None if value == 'none' else value)
+        elif key == 'weights':
+            spec = spec._replace(weights_file=None if value == 'none' else value)
+        elif key == 'backend':
+            spec = spec._replace(backend=value)
+        else:
+            raise ValueError(f'unknown engine option {key!r}')
+    return spec
+
+
+class GameResult(NamedTuple):
+    # 1, 0 or -1 for a win, draw or loss of the first engine
+    score: int
+    plies: int
+    # sum and maximum of the move times and the number of moves of the first and the second engine
+    move_time: Tuple[float, float]
+    max_move_time: Tuple[float, float]
+    moves: Tuple[int, int]
+    # nodes (or playouts) searched by the first and the second engine
+    nodes: Tuple[int, int]
+
+
+def play_game(engines: Sequence[Engine], opening_plies: int = 2, seed: int = 0, max_plies: int = MAX_PLIES,
+              record: List[Position] | None = None, time_control: TimeControl | None = None
+              ) -> Tuple[int | None, int, List[List[float]]]:
+    """
+    engines: white and black engine
+    record: gets a copy of every position an engine moved in
+    time_control: chess clock of the engines, an engine whose time is up loses (the random opening is free)
+    returns the winning side (None for a draw), the number of plies and the move times of both sides
+    """
+    rng = random.Random(seed)
+    pos = Position()
+    times: List[List[float]] = [[], []]
+    seen: Dict[int, int] = {}
+    clock = Clock(time_control) if time_control is not None else None
+    for engine in engines:
+        engine.reset()
+    for ply in range(max_plies):
+        if pos.is_lost():
+            return 1 - pos.turn, ply, times
+        if not pos.hand[WHITE] and not pos.hand[BLACK]:
+            seen[pos.hash] = seen.get(pos.hash, 0) + 1
+            if seen[pos.hash] >= REPETITIONS:
+                return None, ply, times
+        if ply < opening_plies:
+            move = rng.choice(pos.moves())
+        else:
+            if record is not None:
+                record.append(pos.copy())
+            start = time.perf_counter()
+            if clock is not None:
+                clock.start(pos.turn)
+                move = engines[pos.turn].get_move(pos, time_left=clock.time_left(pos.turn),
+                                                  increment=time_control.increment)
+                clock.stop()
+                if clock.flagged(pos.turn):
+                    return 1 - pos.turn, ply, times
+            else:
+                move = engines[pos.turn].get_move(pos)
+            times[pos.turn].append(time.perf_counter() - start)
+        pos.play(move)
+    return None, max_plies, times
+
+
+# engines of a worker process by spec and seat (an engine must not share its state with its opponent)
+_engines: Dict[Tuple[EngineSpec, int], Engine] = {}
+
+
+def _get_engine(spec: EngineSpec, seat: int) -> Engine:
+    engine = _engines.get((spec, seat))
+    if engine is None:
+        engine = _engines[spec, seat] = Engine(spec.level, spec.tt_megabytes, tablebase_dir=spec.tablebase_dir,
+                                               book_file=spec.book_file, weights_file=spec.weights_file,
+                                               backend=spec.backend)
+    return engine
+
+
+def _play(first: EngineSpec, second: EngineSpec, first_white: bool, opening_plies: int, seed: int,
+          max_plies: int, time_control: TimeControl | None) -> GameResult:
+    engines = [_get_engine(first, 0), _get_engine(second, 1)]
+    for i, engine in enumerate(engines):
+        engine.random.seed(seed * 2 + i)
+    nodes = [engine.nodes for engine in engines]
+    winner, plies, times = play_game(engines if first_white else engines[::-1], opening_plies, seed, max_plies,
+                                     time_control=time_control)
+    sides = (WHITE, BLACK) if first_white else (BLACK, WHITE)
+    score = 0 if winner is None else (1 if winner == sides[0] else -1)
+    return GameResult(
+        score, plies,
+        (sum(times[sides[0]]), sum(times[sides[1]])),
+        (max(times[sides[0]], default=0.0), max(times[sides[1]], default=0.0)),
+        (len(times[sides[0]]), len(times[sides[1]])),
+        (engines[0].nodes - nodes[0], engines[1].nodes - nodes[1]),
+    )
+
+
+def run_tournament(first: EngineSpec, second: EngineSpec, games: int, workers: int | None = None,
+                   opening_plies: int = 2, max_plies: int = MAX_PLIES, seed: int = 0,
+                   time_control: TimeControl | None = None) -> Iterable[GameResult]:
+    """yields the results of the games in the order they finish"""
+    jobs = [(first, second, i % 2 == 0, opening_plies, seed + i // 2, max_plies, time_control) for i in range(games)]
+    if workers == 1:
+        for job in jobs:
+            yield _play(*job)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_play, *job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def elo(score: float) -> float:
+    """elo difference of an expected score"""
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_interval(wins: int, draws: int, losses: int, z: float = 1.96) -> Tuple[float, float, float] | None:
+    """
+    elo difference and the bounds of its confidence interval (normal approximation of the score), None without games
+    scores are kept half a game away from 0% and 100%, so all wins or all losses give finite values
+    """
+    n = wins + draws + losses
+    if n == 0:
+        return None
+    low, high = 0.5 / n, 1 - 0.5 / n
+    score = min(max((wins + draws / 2) / n, low), high)
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    error = math.sqrt(variance / n)
+    return elo(score), elo(max(score - z * error, low)), elo(min(score + z * error, high))
+
+
+def report(first: EngineSpec, second: EngineSpec, results: List[GameResult], seconds: float) -> str:
+    wins = sum(r.score == 1 for r in results)
+    draws = sum(r.score == 0 for r in results)
+    losses = sum(r.score == -1 for r in results)
+    n = len(results)
+    if not n:
+        return f'{first.name} vs {second.name}: no games'
+    diff, low, high = elo_interval(wins, draws, losses)
+    lines = [
+        f'{first.name} vs {second.name}: {n} games',
+        f'  wins {wins}, draws {draws}, losses {losses} (score {(wins + draws / 2) / n:.1%})',
+        f'  elo difference {diff:+.0f} (95% interval {low:+.0f} .. {high:+.0f})',
+    ]
+    for i, spec in enumerate((first, second)):
+        moves = sum(r.moves[i] for r in results)
+        average = sum(r.move_time[i] for r in results) / moves if moves else 0.0
+        worst = max(r.max_move_time[i] for r in results)
+        seconds_searched = sum(r.move_time[i] for r in results)
+        rate = sum(r.nodes[i] for r in results) / seconds_searched if seconds_searched else 0.0
+        unit = 'playouts' if spec.backend == MCTS_BACKEND else 'nodes'
+        lines.append(f'  {spec.name}: {average * 1000:.1f} ms per move on average, {worst * 1000:.1f} ms at most, '
+                     f'{rate:,.0f} {unit}/s')
+    lines.append(f'  {n / seconds:.2f} games/s, {sum(r.plies for r in results) / n:.1f} plies per game')
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='play ai vs ai games of the mill game without a window')
+    parser.add_argument('first', help='first engine, LEVEL[:option=value,...]')
+    parser.add_argument('second', help='second engine')
+    parser.add_argument('--games', type=int, default=100, help='number of games (default: 100)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='number of processes (default: all cores)')
+    parser.add_argument('--opening-plies', type=int, default=2,
+                        help='random plies at the start of every pair of games (default: 2)')
+    parser.add_argument('--max-plies', type=int, default=MAX_PLIES,
+                        help=f'games are draws after this many plies (default: {MAX_PLIES})')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random openings (default: 0)')
+    parser.add_argument('--clock', type=TimeControl.parse, default=None, metavar='MINUTES+SECONDS',
+                        help='chess clock of both engines like 1+0.5, an engine whose time is up loses')
+    args = parser.parse_args(argv)
+
+    first, second = parse_engine(args.first), parse_engine(args.second)
+    start = time.perf_counter()
+    results = []
+    for result in run_tournament(first, second, args.games, args.workers, args.opening_plies, args.max_plies,
+                                 args.seed, args.clock):
+        results.append(result)
+        print(f'\r{len(results)}/{args.games} games', end='', flush=True)
+    print()
+    print(report(first, second, results, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""transposition table keyed by the zobrist hash of a position"""
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+from mill.position import MOVE
+
+# bound types
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# replacement policies
+DEPTH_PREFERRED = 'depth'
+ALWAYS_REPLACE = 'always'
+
+# (hash, depth, bound, score, move, generation)
+ENTRY = Tuple[int, int, int, int, Optional[MOVE], int]
+
+BUCKET_SIZE = 2
+# rough size of a stored entry in bytes (tuple, hash int and move tuple)
+ENTRY_SIZE = 200
+
+
+class TranspositionTable:
+    """
+    The table is a flat list of buckets with BUCKET_SIZE slots. With the depth preferred policy the first slot of a
+    bucket keeps the deepest entry of the current search, replaced entries fall back to the other slots.
+    With the always replace policy a new entry always goes into the first slot.
+    """
+
+    def __init__(self, megabytes: float = 32, policy: str = DEPTH_PREFERRED):
+        if policy not in (DEPTH_PREFERRED, ALWAYS_REPLACE):
+            raise ValueError(f'unknown replacement policy {policy!r}')
+        self.policy = policy
+        self.buckets = max(1, int(megabytes * 2 ** 20) // (ENTRY_SIZE * BUCKET_SIZE))
+        self.entries: List[ENTRY | None] = [None] * (self.buckets * BUCKET_SIZE)
+        self.generation = 0
+
+    def clear(self) -> None:
+        self.entries = [None] * (self.buckets * BUCKET_SIZE)
+        self.generation = 0
+
+    def new_search(self) -> None:
+        """entries of older searches are replaced first"""
+        self.generation += 1
+
+    def probe(self, key: int) -> ENTRY | None:
+        i = key % self.buckets * BUCKET_SIZE
+        for entry in self.entries[i:i + BUCKET_SIZE]:
+            if entry is not None and entry[0] == key:
+                return entry
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, move: MOVE | None) -> None:
+        entries = self.entries
+        i = key % self.buckets * BUCKET_SIZE
+        entry = key, depth, bound, score, move, self.generation
+
+        # same position: keep the old best move if the new search has none
+        for j in range(i, i + BUCKET_SIZE):
+            old = entries[j]
+            if old is not None and old[0] == key:
+                if move is None:
+                    entry = key, depth, bound, score, old[4], self.generation
+                if self.policy == ALWAYS_REPLACE or depth >= old[1] or old[5] != self.generation or bound == EXACT:
+                    entries[j] = entry
+                return
+
+        if self.policy == DEPTH_PREFERRED:
+            first = entries[i]
+            if first is None or first[5] != self.generation or depth >= first[1]:
+                # move the replaced entry to the always replace slots
+                entries[i + 1:i + BUCKET_SIZE] = [first, *entries[i + 1:i + BUCKET_SIZE - 1]]
+                entries[i] = entry
+            else:
+                entries[i + 1:i + BUCKET_SIZE] = [entry, *entries[i + 1:i + BUCKET_SIZE - 1]]
+        else:
+            entries[i:i + BUCKET_SIZE] = [entry, *entries[i:i + BUCKET_SIZE - 1]]
+
+    def usage(self) -> float:
+        """fraction of used slots"""
+        return sum(entry is not None for entry in self.entries) / len(self.entries)
@@ -0,0 +1,235 @@
+"""
+terminal front-end, plays in any terminal without pygame or a display (for example over ssh)
+
+The points are named like the squares of a chess board, a-g from left to right and 1-7 from bottom to top. A move is
+entered as d2 while placing and as d2-d3 while moving or flying, xf4 at the end removes a piece after a mill
+(d2-d3xf4). A missing removal is asked for. The other commands are moves, undo, help and quit.
+
+    python -m mill.tui
+    python -m mill.tui --white 3 --black human
+    python -m mill.tui --clock 5+3
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from mill.book import BOOK_FILE
+from mill.engine import ALPHA_BETA, BACKENDS, Engine
+from mill.position import MOVE, Position, board_str
+from mill.state import OVER, PLACING, GameState, IllegalMove
+from mill.tablebase import TABLEBASE_DIR
+from mill.timecontrol import Clock, TimeControl, format_time
+from mill.topology import GRID, POINTS
+
+HUMAN = -1
+PLAYERS = ('white', 'black')
+# a position of the moving phase reached this often is a draw
+REPETITIONS = 3
+
+_COLUMNS = 'abcdefg'
+HELP = '''moves: d2 places a piece, d2-d3 moves or flies a piece, append xf4 to remove a piece after a mill
+commands: moves (list the legal moves), undo (take back your last move), help, quit'''
+
+
+def point_name(point: int) -> str:
+    col, row = GRID[point]
+    return f'{_COLUMNS[col]}{7 - row}'
+
+
+_POINT_NAMES: Dict[str, int] = {point_name(i): i for i in range(len(POINTS))}
+
+
+def parse_point(text: str) -> int:
+    try:
+        return _POINT_NAMES[text.strip().lower()]
+    except KeyError:
+        raise ValueError(f'{text.strip()!r} is no point of the board') from None
+
+
+def format_move(move: MOVE) -> str:
+    src, dest, rmv = move
+    res = point_name(dest) if src is None else f'{point_name(src)}-{point_name(dest)}'
+    return res if rmv is None else f'{res}x{point_name(rmv)}'
+
+
+def parse_move(text: str) -> MOVE:
+    text, _, rmv = text.strip().lower().partition('x')
+    src, _, dest = text.rpartition('-')
+    return parse_point(src) if src else None, parse_point(dest), parse_point(rmv) if rmv else None
+
+
+def render(position: Position) -> str:
+    """the board with the names of the rows and columns and the pieces in hand"""
+    lines = [f'{7 - i} {line}' for i, line in enumerate(board_str(*position.pieces).splitlines())]
+    lines.append('  ' + '  '.join(_COLUMNS))
+    if any(position.hand):
+        lines.append(f'in hand: white {position.hand[0]}, black {position.hand[1]}')
+    return '\n'.join(lines)
+
+
+class Terminal:
+    def __init__(self, levels: Sequence[int] = (HUMAN, 3), tt_megabytes: float = 32,
+                 book_file: str | None = BOOK_FILE, tablebase_dir: str | None = TABLEBASE_DIR,
+                 read: Callable[[str], str] = input, write: Callable[[str], None] = print, backend: str = ALPHA_BETA,
+                 time_control: TimeControl | None = None):
+        """
+        levels: level of the ai of white and black, HUMAN for a player at the keyboard
+        read, write: input and output of the terminal
+        backend: search of the ai (see mill/engine.py)
+        time_control: chess clock of both players, a player whose time is up loses (a human after entering the move)
+        """
+        self.levels = list(levels)
+        self.state = GameState()
+        self.engines: List[Engine | None] = [
+            Engine(level, tt_megabytes, tablebase_dir=tablebase_dir, book_file=book_file, backend=backend)
+            if level != HUMAN else None
+            for level in self.levels
+        ]
+        self.clock = Clock(time_control) if time_control is not None else None
+        self._read = read
+        self._write = write
+
+    def run(self) -> int | None:
+        """plays until the game is over or the user quits, returns the winner (None for a draw or quit)"""
+        shown = None
+        try:
+            while True:
+                # the board is shown again after every move, not after commands and errors
+                if shown != len(self.state.history):
+                    shown = len(self.state.history)
+                    self._write(render(self.state.position))
+                    if self.clock is not None:
+                        self._write('  '.join(f'{name} {format_time(self.clock.time_left(side))}'
+                                              for side, name in enumerate(PLAYERS)))
+                if self.clock is not None:
+                    # the increment is only added if the time wasn't up
+                    self.clock.start(self.state.turn)
+                    for side, name in enumerate(PLAYERS):
+                        if self.clock.flagged(side):
+                            self._write(f'{name} lost on time')
+                            return 1 - side
+                if self.state.phase() == OVER:
+                    winner = self.state.winner()
+                    self._write(f'{PLAYERS[winner]} wins')
+                    return winner
+                if self._repetitions() >= REPETITIONS:
+                    self._write('draw by repetition')
+                    return None
+                engine = self.engines[self.state.turn]
+                if engine is not None:
+                    self._ai_turn(engine)
+                elif not self._human_turn():
+                    return None
+        except (EOFError, KeyboardInterrupt):
+            self._write('')
+            return None
+        finally:
+            for engine in self.engines:
+                if engine is not None:
+                    engine.close()
+
+    def _repetitions(self) -> int:
+        """how often the current position of the moving phase was reached"""
+        if self.state.position.hand != [0, 0]:
+            return 0
+        pos = Position()
+        res = 0
+        for move in self.state.history:
+            pos.play(move)
+            res += pos.hash == self.state.position.hash
+        return res
+
+    def _ai_turn(self, engine: Engine) -> None:
+        name = PLAYERS[self.state.turn]
+        start = time.perf_counter()
+        if self.clock is not None:
+            move = engine.get_move(self.state.position.copy(), time_left=self.clock.time_left(self.state.turn),
+                                   increment=self.clock.control.increment)
+        else:
+            move = engine.get_move(self.state.position.copy())
+        self.state.apply(move)
+        self._write(f'{name} plays {format_move(move)} ({(time.perf_counter() - start) * 1000:.0f} ms)')
+
+    def _human_turn(self) -> bool:
+        """reads and plays a move or a command of the player, returns False if the player quits"""
+        state = self.state
+        if state.phase() == PLACING:
+            action = 'place'
+        else:
+            action = 'fly' if state.is_flying() else 'move'
+        command = self._read(f'{PLAYERS[state.turn]} to {action}: ').strip().lower()
+        if command in ('q', 'quit', 'exit'):
+            return False
+        if command in ('h', 'help', '?'):
+            self._write(HELP)
+        elif command == 'moves':
+            self._write(' '.join(sorted(format_move(move) for move in state.moves())))
+        elif command == 'undo':
+            self._undo()
+        elif command:
+            try:
+                src, dest, rmv = parse_move(command)
+                if rmv is not None:
+                    if not state.is_legal((src, dest, rmv)):
+                        raise IllegalMove(f'{command} is not a legal move.')
+                    state.apply((src, dest, rmv))
+                elif state.begin(src, dest):
+                    self._read_removal()
+            except (ValueError, IllegalMove) as e:
+                self._write(str(e))
+        return True
+
+    def _read_removal(self) -> None:
+        while True:
+            command = self._read('remove: ').strip().lower()
+            if command == 'undo':
+                # takes back the pending move
+                self.state.undo()
+                return
+            try:
+                self.state.finish(parse_point(command))
+                return
+            except (ValueError, IllegalMove) as e:
+                self._write(str(e))
+
+    def _undo(self) -> None:
+        """takes back the moves since the last move of a human"""
+        # the plies alternate, the last one was played by the side that isn't to move
+        played = {(self.state.turn + 1 + i) % 2 for i in range(min(len(self.state.history), 2))}
+        if all(self.levels[side] != HUMAN for side in played):
+            # only the moves of the ai, run would play them again at once
+            self._write('There is no move of yours to undo.')
+            return
+        self.state.undo()
+        while self.state.history and self.levels[self.state.turn] != HUMAN:
+            self.state.undo()
+
+
+def _parse_level(text: str) -> int:
+    return HUMAN if text == 'human' else int(text)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='play mill in the terminal')
+    parser.add_argument('--white', type=_parse_level, default=HUMAN,
+                        help='human or the level of the ai, 0 plays random moves (default: human)')
+    parser.add_argument('--black', type=_parse_level, default=3, help='human or the level of the ai (default: 3)')
+    parser.add_argument('--tt', type=float, default=32, help='megabytes of the transposition table (default: 32)')
+    parser.add_argument('--no-book', action='store_true', help='play without the opening book')
+    parser.add_argument('--no-tablebase', action='store_true', help='play without the endgame tablebase')
+    parser.add_argument('--backend', choices=BACKENDS, default=ALPHA_BETA,
+                        help=f'search of the ai (default: {ALPHA_BETA})')
+    parser.add_argument('--clock', type=TimeControl.parse, default=None, metavar='MINUTES+SECONDS',
+                        help='chess clock of both players like 5+3, 5 minutes and 3 seconds after every move')
+    args = parser.parse_args(argv)
+
+    terminal = Terminal((args.white, args.black), args.tt, None if args.no_book else BOOK_FILE,
+                        None if args.no_tablebase else TABLEBASE_DIR, backend=args.backend, time_control=args.clock)
+    print(HELP)
+    terminal.run()
+
+
+if __name__ == '__main__':
+    main()
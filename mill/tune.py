@@ -0,0 +1,228 @@
+"""
+texel tuning of the evaluation weights on positions of headless games
+
+collect plays ai vs ai games (see mill/tournament.py) and stores every quiet position an engine moved in with the
+result of the game from the view of the side to move (1 win, 0.5 draw, 0 loss). A position is quiet if the side to
+move can't close a mill. fit maps the evaluation of every position to an expected result with
+sigmoid(scale * evaluation), first fits the scale to the current weights and then the weights with batched gradient
+descent (adam) on the mean squared error, the features of all positions are computed at once by mill/batch.py.
+The weights are written to a weights file (see mill/evaluation.py) that the engines load.
+
+    python -m mill.tune collect --games 400 --level 2
+    python -m mill.tune fit --iterations 300
+    python -m mill.tune fit positions.npz --batch-size 65536 --out tuned.weights
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError(f'{__name__} needs numpy: pip install -r requirements-tools.txt') from None
+
+from mill.batch import PositionBatch
+from mill.engine import Engine
+from mill.evaluation import FEATURES, WEIGHTS_FILE, load_weights, save_weights
+from mill.position import Position
+from mill.tournament import play_game
+
+POSITIONS_FILE = 'positions.npz'
+
+
+def _is_quiet(position: Position) -> bool:
+    return all(move[2] is None for move in position.moves())
+
+
+# engines of a worker process by level
+_engines: Dict[int, Tuple[Engine, Engine]] = {}
+
+
+def _collect_game(level: int, opening_plies: int, seed: int) -> Tuple[List[Position], List[float]]:
+    engines = _engines.get(level)
+    if engines is None:
+        # the book would repeat the same openings, the random plies of the opening vary them
+        engines = _engines[level] = Engine(level, book_file=None), Engine(level, book_file=None)
+    for i, engine in enumerate(engines):
+        engine.random.seed(seed * 2 + i)
+    record: List[Position] = []
+    winner, _, _ = play_game(engines, opening_plies, seed, record=record)
+    positions = [pos for pos in record if _is_quiet(pos)]
+    results = [0.5 if winner is None else float(pos.turn == winner) for pos in positions]
+    return positions, results
+
+
+def _run(jobs: List[Tuple[int, int, int]], workers: int | None) -> Iterator[Tuple[List[Position], List[float]]]:
+    if workers == 1:
+        for job in jobs:
+            yield _collect_game(*job)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        yield from pool.map(_collect_game, *zip(*jobs))
+
+
+def collect(games: int, level: int = 2, opening_plies: int = 6, seed: int = 0, workers: int | None = None,
+            verbose: bool = False) -> Tuple[PositionBatch, np.ndarray]:
+    """quiet positions of the games and the results from the view of the side to move"""
+    jobs = [(level, opening_plies, seed + i) for i in range(games)]
+    positions: List[Position] = []
+    results: List[float] = []
+    start = time.perf_counter()
+    for i, (game_positions, game_results) in enumerate(_run(jobs, workers)):
+        positions.extend(game_positions)
+        results.extend(game_results)
+        if verbose:
+            print(f'\r{i + 1}/{games} games, {len(positions)} positions, '
+                  f'{len(positions) / (time.perf_counter() - start):.0f} positions/s', end='', flush=True)
+    if verbose:
+        print()
+    return PositionBatch.from_positions(positions), np.array(results)
+
+
+def save_positions(path: str, batch: PositionBatch, results: np.ndarray) -> None:
+    np.savez_compressed(path, pieces=batch.pieces, turn=batch.turn, hand=batch.hand, results=results)
+
+
+def load_positions(path: str = POSITIONS_FILE) -> Tuple[PositionBatch, np.ndarray]:
+    with np.load(path) as data:
+        return PositionBatch(data['pieces'], data['turn'], data['hand']), data['results']
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-x))
+
+
+def error(features: np.ndarray, results: np.ndarray, weights: np.ndarray, scale: float) -> float:
+    """mean squared error of the expected results"""
+    return float(np.mean((results - _sigmoid(scale * (features @ weights))) ** 2))
+
+
+def fit_scale(features: np.ndarray, results: np.ndarray, weights: np.ndarray, low: float = 1e-5,
+              high: float = 1.0, steps: int = 60) -> float:
+    """scale of the evaluation with the smallest error, golden section search on a log scale"""
+    ratio = (math.sqrt(5) - 1) / 2
+    a, b = math.log(low), math.log(high)
+    for _ in range(steps):
+        c = b - ratio * (b - a)
+        d = a + ratio * (b - a)
+        if error(features, results, weights, math.exp(c)) < error(features, results, weights, math.exp(d)):
+            b = d
+        else:
+            a = c
+    return math.exp((a + b) / 2)
+
+
+def fit(features: np.ndarray, results: np.ndarray, weights: np.ndarray, scale: float, iterations: int = 300,
+        learning_rate: float = 0.5, batch_size: int | None = None, seed: int = 0, report: int = 10) -> np.ndarray:
+    """
+    features: N x len(FEATURES) differences of the features of the side to move and its opponent
+    batch_size: positions of every gradient step, None uses all positions
+    report: prints the error and the time of the iterations every report iterations, 0 prints nothing
+    returns the fitted weights
+    """
+    rng = np.random.default_rng(seed)
+    weights = weights.astype(np.float64)
+    n = len(results)
+    # adam
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    m = np.zeros_like(weights)
+    v = np.zeros_like(weights)
+    elapsed = 0.0
+    for i in range(1, iterations + 1):
+        start = time.perf_counter()
+        if batch_size is None or batch_size >= n:
+            x, y = features, results
+        else:
+            rows = rng.integers(0, n, batch_size)
+            x, y = features[rows], results[rows]
+        expected = _sigmoid(scale * (x @ weights))
+        gradient = x.T @ ((expected - y) * expected * (1 - expected)) * (2 * scale / len(y))
+        m = beta1 * m + (1 - beta1) * gradient
+        v = beta2 * v + (1 - beta2) * gradient ** 2
+        weights -= learning_rate * (m / (1 - beta1 ** i)) / (np.sqrt(v / (1 - beta2 ** i)) + epsilon)
+        elapsed += time.perf_counter() - start
+        if report and (i % report == 0 or i == iterations):
+            print(f'iteration {i:>5}: error {error(features, results, weights, scale):.6f}, '
+                  f'{elapsed / i * 1000:.2f} ms per iteration ({len(y) * i / elapsed:,.0f} positions/s)')
+    return weights
+
+
+def _features(batch: PositionBatch, chunk: int = 1 << 18) -> np.ndarray:
+    """feature differences of all positions, computed in chunks to bound the memory of the temporary arrays"""
+    res = np.empty((len(batch), len(FEATURES)))
+    for i in range(0, len(batch), chunk):
+        part = PositionBatch(batch.pieces[i:i + chunk], batch.turn[i:i + chunk], batch.hand[i:i + chunk])
+        res[i:i + chunk] = part.feature_differences()
+    return res
+
+
+def tune(batch: PositionBatch, results: np.ndarray, weights: Sequence[int], iterations: int = 300,
+         learning_rate: float = 0.5, batch_size: int | None = None, seed: int = 0,
+         report: int = 10) -> Tuple[Tuple[int, ...], Dict[str, float]]:
+    """returns the rounded weights and information about the fit"""
+    start = time.perf_counter()
+    features = _features(batch)
+    initial = np.array(weights, dtype=np.float64)
+    if report:
+        print(f'features of {len(results)} positions in {time.perf_counter() - start:.3f}s')
+    scale = fit_scale(features, results, initial)
+    initial_error = error(features, results, initial, scale)
+    if report:
+        print(f'scale {scale:.6f}, error of the current weights {initial_error:.6f}')
+    fitted = fit(features, results, initial, scale, iterations, learning_rate, batch_size, seed, report)
+    rounded = tuple(int(round(w)) for w in fitted)
+    final_error = error(features, results, np.array(rounded, dtype=np.float64), scale)
+    info = {'scale': scale, 'positions': len(results), 'iterations': iterations, 'error': final_error,
+            'initial_error': initial_error, 'seconds': round(time.perf_counter() - start, 3)}
+    return rounded, info
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='tune the weights of the evaluation on positions of ai vs ai games')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    parser_collect = commands.add_parser('collect', help='play games and store their quiet positions')
+    parser_collect.add_argument('--games', type=int, default=200, help='number of games (default: 200)')
+    parser_collect.add_argument('--level', type=int, default=2, help='level of both engines (default: 2)')
+    parser_collect.add_argument('--opening-plies', type=int, default=6,
+                                help='random plies at the start of every game (default: 6)')
+    parser_collect.add_argument('--seed', type=int, default=0, help='seed of the random openings (default: 0)')
+    parser_collect.add_argument('--workers', type=int, default=os.cpu_count(),
+                                help='number of processes (default: all cores)')
+    parser_collect.add_argument('--out', default=POSITIONS_FILE, help=f'output file (default: {POSITIONS_FILE})')
+
+    parser_fit = commands.add_parser('fit', help='fit the weights to stored positions')
+    parser_fit.add_argument('positions', nargs='?', default=POSITIONS_FILE,
+                            help=f'positions of collect (default: {POSITIONS_FILE})')
+    parser_fit.add_argument('--weights', default=WEIGHTS_FILE,
+                            help=f'start from the weights of this file if it exists (default: {WEIGHTS_FILE})')
+    parser_fit.add_argument('--iterations', type=int, default=300, help='gradient steps (default: 300)')
+    parser_fit.add_argument('--learning-rate', type=float, default=0.5, help='step size of adam (default: 0.5)')
+    parser_fit.add_argument('--batch-size', type=int, default=None,
+                            help='positions of every step (default: all positions)')
+    parser_fit.add_argument('--seed', type=int, default=0, help='seed of the batches (default: 0)')
+    parser_fit.add_argument('--out', default=WEIGHTS_FILE, help=f'output file (default: {WEIGHTS_FILE})')
+    args = parser.parse_args(argv)
+
+    if args.command == 'collect':
+        start = time.perf_counter()
+        batch, results = collect(args.games, args.level, args.opening_plies, args.seed, args.workers, verbose=True)
+        save_positions(args.out, batch, results)
+        print(f'{len(batch)} positions of {args.games} games in {time.perf_counter() - start:.1f}s written to '
+              f'{args.out}')
+    elif args.command == 'fit':
+        batch, results = load_positions(args.positions)
+        weights, info = tune(batch, results, load_weights(args.weights), args.iterations, args.learning_rate,
+                             args.batch_size, args.seed)
+        save_weights(weights, args.out, **info)
+        print('  '.join(f'{name} {w}' for name, w in zip(FEATURES, weights)))
+        print(f'error {info["initial_error"]:.6f} -> {info["error"]:.6f}, weights written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""run ai searches in a background thread, so the game loop keeps rendering while the ai thinks"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Optional
+
+
+class SearchTask:
+    """
+    Calls target(stop) in a daemon thread. target has to return as soon as possible once the stop event is set,
+    searches then return the best move found so far.
+    """
+
+    def __init__(self, target: Callable[[threading.Event], Any], name: str = 'ai-search'):
+        self.stop_event = threading.Event()
+        self.cancelled = False
+        self._target = target
+        self._result: Any = None
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            self._result = self._target(self.stop_event)
+        except BaseException as e:
+            self._error = e
+
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+
+    def result(self) -> Any:
+        """result of target, only valid if done"""
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def join(self, timeout: float | None = None) -> None:
+        """waits for the thread without looking at the result"""
+        self._thread.join(timeout)
+
+    def wait(self, timeout: float | None = None) -> Any:
+        self._thread.join(timeout)
+        return self.result()
+
+    def stop(self) -> None:
+        """finish now with the best result found so far"""
+        self.stop_event.set()
+
+    def cancel(self) -> None:
+        """stop and throw the result away"""
+        self.cancelled = True
+        self.stop_event.set()
@@ -0,0 +1,34 @@
+import threading
+
+import pytest
+
+from mill.engine import Engine
+from mill.position import Position
+
+
+def _engine() -> Engine:
+    return Engine(3, deterministic=True, tablebase_dir=None, book_file=None, weights_file=None)
+
+
+def _ponder(engine: Engine, position: Position, time_left: float | None = None) -> None:
+    stop = threading.Event()
+    timer = threading.Timer(0.5, stop.set)
+    timer.start()
+    engine.ponder(position, stop, time_left=time_left)
+    timer.join()
+
+
+@pytest.mark.parametrize('ponder_clock, move_clock, hits', [
+    (None, None, 1),
+    (0.5, 0.5, 1),
+    (None, 0.5, 0),  # the clock allows less time than the pondered search had
+    (0.5, None, 1),
+])
+def test_ponder_hit_within_budget(ponder_clock, move_clock, hits):
+    position = Position()
+    reply = _engine().get_move(position)
+    engine = _engine()
+    _ponder(engine, position, ponder_clock)
+    position.play(reply)
+    assert engine.get_move(position, time_left=move_clock) is not None
+    assert engine.ponder_hits == hits
@@ -0,0 +1,33 @@
+import pytest
+
+from mill.perft import REFERENCES, divide, perft
+
+# depth 4 and more are left to python -m mill.perft
+MAX_DEPTH = 3
+
+
+@pytest.mark.parametrize('reference', REFERENCES, ids=[reference.name for reference in REFERENCES])
+def test_perft_reference(reference):
+    position = reference.position()
+    key = position.key()
+    for depth, count in enumerate(reference.counts[:MAX_DEPTH], 1):
+        assert perft(position, depth) == count, f'depth {depth}'
+    # play and undo restore the position
+    assert position.key() == key
+
+
+def test_reference_phases():
+    # placing, moving, flying and removals are all covered
+    names = {reference.name for reference in REFERENCES}
+    assert {'start', 'placing with mills', 'moving', 'flying', 'all pieces in mills'} <= names
+    positions = {reference.name: reference.position() for reference in REFERENCES}
+    assert positions['placing with mills'].hand[positions['placing with mills'].turn] > 0
+    assert not positions['moving'].is_flying(positions['moving'].turn)
+    assert positions['flying'].is_flying(positions['flying'].turn)
+    assert any(rmv is not None for _, _, rmv in positions['placing with mills'].moves())
+    assert any(rmv is not None for _, _, rmv in positions['moving'].moves())
+
+
+def test_divide_sums_to_perft():
+    position = REFERENCES[1].position()
+    assert sum(divide(position, 2).values()) == perft(position, 2)
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from mill.perft import parse
+from mill.position import BLACK, WHITE
+from mill.state import MOVING, OVER, PLACING, REMOVING, GameState, IllegalMove
+
+# the rings from outside to inside, inside a ring the points in the order of POINTS:
+# (0, 0) (0, 1) (0, 2) (1, 0) (1, 2) (2, 0) (2, 1) (2, 2)
+# white closes the mill 0 1 2 by placing on 2, black has the mill 8 9 10 and the single piece 19
+MILL_THREAT = 'ww....../bbb...../...b....'
+
+
+def test_apply_undo_round_trip():
+    state = GameState()
+    rng = random.Random(1)
+    seen = []
+    while len(seen) < 60 and state.moves():
+        seen.append((state.position.key(), state.position.hash))
+        state.apply(rng.choice(state.moves()))
+    assert any(rmv is not None for _, _, rmv in state.history)
+    while seen:
+        state.undo()
+        assert (state.position.key(), state.position.hash) == seen.pop()
+        assert state.position.hash == state.position.compute_hash()
+    with pytest.raises(IllegalMove):
+        state.undo()
+
+
+def test_begin_finish_equals_apply():
+    stepped = GameState(parse(MILL_THREAT, WHITE, (7, 5)))
+    assert stepped.begin(None, 2)
+    assert stepped.phase() == REMOVING
+    assert stepped.removable() == 1 << 19
+    stepped.finish(19)
+    applied = GameState(parse(MILL_THREAT, WHITE, (7, 5)))
+    applied.apply((None, 2, 19))
+    assert stepped.position == applied.position
+    assert stepped.position.hash == applied.position.hash
+    assert stepped.history == applied.history == [(None, 2, 19)]
+    assert stepped.pending is None
+
+
+def test_begin_without_mill():
+    state = GameState(parse(MILL_THREAT, WHITE, (7, 5)))
+    assert not state.begin(None, 5)
+    assert state.phase() == PLACING
+    with pytest.raises(IllegalMove):
+        state.finish(19)
+
+
+def test_no_removal_from_mill_while_other_pieces_exist():
+    state = GameState(parse(MILL_THREAT, WHITE, (7, 5)))
+    assert not state.is_legal((None, 2, 8))
+    assert not state.is_legal((None, 2, None))
+    assert state.is_legal((None, 2, 19))
+    # with all pieces in mills the mill removes nothing
+    state = GameState(parse('ww....../bbb...../........', WHITE, (7, 5)))
+    assert not state.is_legal((None, 2, 8))
+    assert state.is_legal((None, 2, None))
+
+
+def test_placing_to_moving():
+    state = GameState(parse('w....w../......../b....b..', WHITE, (1, 1)))
+    assert state.phase() == PLACING
+    state.apply((None, 12, None))
+    assert state.phase() == PLACING
+    state.apply((None, 11, None))
+    assert state.phase() == MOVING
+    assert state.position.hand == [0, 0]
+
+
+def test_moving_to_flying():
+    state = GameState(parse('ww..w.../b....b../b....b.w', WHITE, (0, 0)))
+    assert state.phase() == MOVING
+    assert not state.is_flying(BLACK)
+    state.apply((4, 2, 8))
+    assert state.phase() == MOVING
+    assert state.is_flying(BLACK)
+    assert not state.is_flying(WHITE)
+    assert state.winner() is None
+
+
+def test_winner_with_two_pieces():
+    state = GameState(parse('ww..w.../b......./b....b.w', WHITE, (0, 0)))
+    state.apply((4, 2, 8))
+    assert state.phase() == OVER
+    assert state.winner() == WHITE
+    assert state.moves() == []
+
+
+def test_winner_blocked():
+    state = GameState(parse('bbbwwbw./.w....../........', BLACK, (0, 0)))
+    assert state.phase() == OVER
+    assert state.winner() == WHITE
+    assert not state.is_legal((0, 7, None))
@@ -0,0 +1,26 @@
+import pytest
+
+from mill.timecontrol import TimeControl, format_time
+
+
+@pytest.mark.parametrize('seconds, text', [
+    (0.0, '0:00.0'),
+    (-1.0, '0:00.0'),
+    (9.94, '0:09.9'),
+    (9.96, '0:10'),
+    (10.0, '0:10'),
+    (59.96, '1:00'),
+    (65.0, '1:05'),
+    (300.0, '5:00'),
+])
+def test_format_time(seconds, text):
+    assert format_time(seconds) == text
+
+
+def test_parse_time_control():
+    assert TimeControl.parse('5+3') == TimeControl(300.0, 3.0)
+    assert TimeControl.parse('0.5') == TimeControl(30.0, 0.0)
+    with pytest.raises(ValueError):
+        TimeControl.parse('x')
+    with pytest.raises(ValueError):
+        TimeControl.parse('0+1')
@@ -0,0 +1,30 @@
+import math
+
+from mill.tournament import elo_interval
+
+
+def test_elo_interval_without_games():
+    assert elo_interval(0, 0, 0) is None
+
+
+def test_elo_interval_all_wins():
+    diff, low, high = elo_interval(10, 0, 0)
+    assert all(math.isfinite(value) for value in (diff, low, high))
+    assert 0 < low <= diff <= high
+
+
+def test_elo_interval_all_losses():
+    diff, low, high = elo_interval(0, 0, 10)
+    assert all(math.isfinite(value) for value in (diff, low, high))
+    assert low <= diff <= high < 0
+
+
+def test_elo_interval_single_game():
+    assert all(math.isfinite(value) for value in elo_interval(1, 0, 0))
+    assert all(math.isfinite(value) for value in elo_interval(0, 1, 0))
+
+
+def test_elo_interval_even_score():
+    diff, low, high = elo_interval(5, 10, 5)
+    assert diff == 0
+    assert low < 0 < high
@@ -0,0 +1,33 @@
+from mill.tui import HUMAN, Terminal, parse_point
+
+
+def _play(levels, commands):
+    """runs a terminal with scripted input, returns it and its output"""
+    commands = iter(commands)
+    output = []
+    terminal = Terminal(levels, 1, book_file=None, tablebase_dir=None, read=lambda prompt: next(commands),
+                        write=output.append)
+    terminal.run()
+    return terminal, output
+
+
+def test_undo_before_the_first_move_of_the_human():
+    # black is the human, the opening move of the ai stays
+    terminal, output = _play((1, HUMAN), ['undo', 'quit'])
+    assert 'There is no move of yours to undo.' in output
+    assert len(terminal.state.history) == 1
+
+
+def test_undo_takes_back_the_reply_of_the_ai():
+    # white is the human, undo takes back the move of the human and the reply
+    terminal, output = _play((HUMAN, 1), ['undo', 'a1', 'undo', 'quit'])
+    assert output.count('There is no move of yours to undo.') == 1
+    assert any(line.startswith('black plays') for line in output)
+    assert terminal.state.history == []
+
+
+def test_undo_between_humans():
+    # every move is one of a human, undo takes back only the last one
+    terminal, output = _play((HUMAN, HUMAN), ['undo', 'a1', 'g7', 'undo', 'quit'])
+    assert output.count('There is no move of yours to undo.') == 1
+    assert terminal.state.history == [(None, parse_point('a1'), None)]